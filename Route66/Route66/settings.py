@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import django
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,6 +21,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Route66Store.middleware.RequestMetricsMiddleware',
+    'Route66Store.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +52,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Route66.wsgi.application'
+ASGI_APPLICATION = 'Route66.asgi.application'
+
+# Serve the catalog pages from Route66Store.async_views (set by Route66/asgi.py)
+ASYNC_CATALOG_VIEWS = os.environ.get('ROUTE66_ASYNC_VIEWS', '') == '1'
 
 DATABASES = {
     'default': {
@@ -57,6 +64,99 @@ DATABASES = {
     }
 }
 
+# Optional catalog read replica and cart/session database (Route66Store.routers).
+# Any SQLite file works as a local stand-in; the replica must start as a copy
+# of db.sqlite3, and the cart database is set up with `migrate --database carts`.
+if os.environ.get('ROUTE66_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['ROUTE66_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+if os.environ.get('ROUTE66_CART_DB'):
+    DATABASES['carts'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['ROUTE66_CART_DB'],
+    }
+
+DATABASE_ROUTERS = ['Route66Store.routers.StoreRouter']
+
+# SQLite tuning (Route66Store.sqlite): 'performance' applies WAL and friends to
+# every connection, keeps connections open between requests and starts
+# transactions with BEGIN IMMEDIATE (Django 5.1+); 'default' is stock SQLite.
+SQLITE_PROFILE = os.environ.get('ROUTE66_SQLITE_PROFILE', 'performance')
+if SQLITE_PROFILE == 'performance':
+    for _alias, _db in DATABASES.items():
+        _db['CONN_MAX_AGE'] = 600
+        _db['CONN_HEALTH_CHECKS'] = True
+        if django.VERSION >= (5, 1) and _alias != 'replica':
+            _db.setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
+# Seconds a client reads the catalog from the primary after writing to it
+REPLICA_PIN_SECONDS = 15
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'route66',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'route66-sessions',
+    },
+}
+
+# Sessions are read from the 'sessions' cache and written through to the
+# database (Route66Store.session_store). SESSION_CACHE_TIMEOUT caps how long a
+# cached copy is trusted; with a shared cache (Redis/memcached) behind
+# 'sessions' it can be raised to SESSION_COOKIE_AGE.
+SESSION_ENGINE = 'Route66Store.session_store'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_CACHE_TIMEOUT = 5 * 60
+
+# Flash messages travel in a signed cookie, so setting one doesn't write the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Seconds a computed cart summary (badge count/total) stays cached
+CART_SUMMARY_TIMEOUT = 60 * 60
+
+# Full-page cache for anonymous catalog pages (Route66Store.page_cache)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 5 * 60
+
+# Resized catalog image derivatives (Route66Store.images)
+IMAGE_DERIVATIVE_WIDTHS = (160, 320, 640)
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Request metrics (Route66Store.middleware / Route66Store.metrics)
+SLOW_QUERY_MS = 100
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'Route66Store': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Seconds a shopper's wishlist product-id set stays cached (Route66Store.wishlists)
+WISHLIST_CACHE_TIMEOUT = 60 * 60
+
+# Related products kept per product by build_related_products (Route66Store.recommendations)
+RELATED_PRODUCTS_STORED = 12
+
+# Guest carts live in a signed cookie until login (Route66Store.cart_store)
+GUEST_CART_COOKIE = 'r66_cart'
+GUEST_CART_MAX_AGE = 30 * 24 * 60 * 60
+GUEST_CART_MAX_LINES = 50
+
+# How long stock stays reserved after a customer opens checkout
+STOCK_HOLD_SECONDS = 10 * 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -81,3 +181,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Admin changelists count at most this many rows exactly; bigger unfiltered
+# tables show the planner's row estimate instead (Route66Store.admin)
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Header search suggestions (Route66Store.autocomplete): how many are returned,
+# how often a process checks whether another one changed the catalog, and how
+# old its in-memory index may get before a full rebuild
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_CHECK_SECONDS = 30
+AUTOCOMPLETE_MAX_AGE = 15 * 60
@@ -1,19 +1,97 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.utils import model_ngettext
 from django import forms
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Now, Round
+from django.utils.functional import cached_property
 from django.utils.text import slugify
+from . import autocomplete, page_cache, routers
 from .models import Category, Brand, Product, HotWheelsCase, Order, OrderItem, Cart, CartItem, Review, Wishlist
 
 
 def _unique_slug(model_cls, base_slug: str) -> str:
+    """base_slug, or base_slug-2, -3, ... whichever is free first, found with one query."""
     base_slug = (base_slug or "").strip() or "item"
+    taken = set(
+        model_cls.objects.filter(Q(slug=base_slug) | Q(slug__startswith=f"{base_slug}-"))
+        .values_list("slug", flat=True)
+    )
     slug = base_slug
     i = 2
-    while model_cls.objects.filter(slug=slug).exists():
+    while slug in taken:
         slug = f"{base_slug}-{i}"
         i += 1
     return slug
 
 
+def _exact_count_limit():
+    return getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000)
+
+
+def table_row_estimate(queryset):
+    """
+    The planner's idea of how many rows queryset's table holds, or None when
+    there are no statistics (SQLite: sqlite_stat1, filled by ANALYZE, see
+    sqlite_maintenance; PostgreSQL: pg_class.reltuples).
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        # stat starts with the row count of the index; partial indexes count fewer
+        sql = "SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s"
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None  # never analyzed
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that never runs an exact COUNT(*) over a whole big
+    table. Unfiltered lists larger than ADMIN_EXACT_COUNT_LIMIT report the
+    table's row estimate; everything else is counted exactly up to that limit,
+    so a broad filter shows at most limit rows' worth of pages.
+    """
+
+    @cached_property
+    def count(self):
+        limit = _exact_count_limit()
+        if not self.object_list.query.where:
+            estimate = table_row_estimate(self.object_list)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return self.object_list.order_by().values('pk')[:limit].count()
+
+
+class _LargeChangeListMixin:
+    paginator = EstimatedCountPaginator
+    # "N total" next to a filtered count would be an exact count of everything
+    show_full_result_count = False
+
+
+class _CartOwnerMixin:
+    """Changelists of cart-database models whose __str__ names the user."""
+
+    def get_list_select_related(self, request):
+        # A separate cart database has no user table to join against
+        return False if routers.separate_cart_db() else ['user']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.prefetch_related('user') if routers.separate_cart_db() else queryset
+
+
 class _SlugOptionalFormMixin(forms.ModelForm):
     """
     Admin UX: allow leaving slug empty; we auto-generate it.
@@ -35,6 +113,73 @@ class _SlugOptionalFormMixin(forms.ModelForm):
         return slug
 
 
+class CatalogActionForm(ActionForm):
+    """
+    Inputs for the bulk catalog actions, shown next to the action dropdown.
+    They are plain text here because the changelist drops the whole action
+    ("No action selected.") when this form doesn't validate; the actions
+    clean them with ``inputs`` and say what was wrong.
+    """
+    percent = forms.CharField(label="Price change %", required=False, widget=forms.NumberInput(attrs={"step": "0.1"}))
+    quantity = forms.CharField(label="Restock by", required=False, widget=forms.NumberInput)
+
+    inputs = {
+        'percent': forms.DecimalField(max_digits=5, decimal_places=1, min_value=-90, max_value=500),
+        'quantity': forms.IntegerField(min_value=1, max_value=100000),
+    }
+
+
+class _CatalogBulkActionsMixin:
+    """
+    Bulk edits for catalog changelists, each one UPDATE over the selection
+    (or the whole filtered list with "select all"). UPDATEs skip the model
+    signals, so updated_at and the page cache generation are bumped here.
+    """
+    action_form = CatalogActionForm
+    scaled_price_fields = ('price',)
+
+    def _action_input(self, request, name):
+        """The cleaned action form input, or None after telling the user what's wrong."""
+        try:
+            return self.action_form.inputs[name].clean(request.POST.get(name))
+        except forms.ValidationError as error:
+            label = self.action_form.base_fields[name].label
+            self.message_user(request, f"{label}: {' '.join(error.messages)}", messages.ERROR)
+            return None
+
+    def _bulk_update(self, request, queryset, description, **changes):
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            updated = queryset.update(updated_at=Now(), **changes)
+        page_cache.bump_generation()
+        autocomplete.catalog_changed()
+        self.message_user(request, f"{description}: {updated} {model_ngettext(self.opts, updated)} updated.")
+
+    @admin.action(description="Change price by %%")
+    def change_price(self, request, queryset):
+        percent = self._action_input(request, 'percent')
+        if percent is None:
+            return
+        factor = 1 + percent / 100
+        self._bulk_update(
+            request, queryset, f"Prices changed by {percent}%",
+            **{field: Round(F(field) * factor, 2) for field in self.scaled_price_fields},
+        )
+
+    @admin.action(description="Restock by quantity")
+    def restock(self, request, queryset):
+        quantity = self._action_input(request, 'quantity')
+        if quantity is not None:
+            self._bulk_update(request, queryset, f"Restocked by {quantity}", stock=F('stock') + quantity)
+
+    @admin.action(description="Mark as featured")
+    def mark_featured(self, request, queryset):
+        self._bulk_update(request, queryset, "Featured", is_featured=True)
+
+    @admin.action(description="Remove from featured")
+    def unmark_featured(self, request, queryset):
+        self._bulk_update(request, queryset, "No longer featured", is_featured=False)
+
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -52,6 +197,8 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Brand)
 class BrandAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug']
+    search_fields = ['name']
+    ordering = ['name']
     prepopulated_fields = {'slug': ('name',)}
     form = type("BrandAdminForm", (_SlugOptionalFormMixin,), {"Meta": type("Meta", (), {"model": Brand, "fields": "__all__"})})
 
@@ -67,12 +214,16 @@ class ProductImageInline(admin.TabularInline):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(_LargeChangeListMixin, _CatalogBulkActionsMixin, admin.ModelAdmin):
     list_display = ['name', 'brand', 'category', 'scale', 'price', 'stock', 'is_featured', 'is_new_arrival', 'is_treasure_hunt']
     list_filter = ['category', 'brand', 'scale', 'is_featured', 'is_new_arrival', 'is_treasure_hunt', 'is_super_treasure_hunt']
+    list_select_related = ['brand', 'category']
     search_fields = ['name', 'car_model', 'series']
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ['price', 'stock', 'is_featured', 'is_new_arrival']
+    autocomplete_fields = ['brand', 'category']
+    scaled_price_fields = ('price', 'sale_price')
+    actions = ['change_price', 'restock', 'mark_featured', 'unmark_featured', 'mark_new_arrival', 'unmark_new_arrival']
     form = type("ProductAdminForm", (_SlugOptionalFormMixin,), {"Meta": type("Meta", (), {"model": Product, "fields": "__all__"})})
 
     def save_model(self, request, obj, form, change):
@@ -80,13 +231,23 @@ class ProductAdmin(admin.ModelAdmin):
             obj.slug = _unique_slug(Product, slugify(obj.name))
         super().save_model(request, obj, form, change)
 
+    @admin.action(description="Mark as new arrival")
+    def mark_new_arrival(self, request, queryset):
+        self._bulk_update(request, queryset, "New arrivals", is_new_arrival=True)
+
+    @admin.action(description="Remove from new arrivals")
+    def unmark_new_arrival(self, request, queryset):
+        self._bulk_update(request, queryset, "No longer new arrivals", is_new_arrival=False)
+
 
 @admin.register(HotWheelsCase)
-class HotWheelsCaseAdmin(admin.ModelAdmin):
+class HotWheelsCaseAdmin(_LargeChangeListMixin, _CatalogBulkActionsMixin, admin.ModelAdmin):
     list_display = ['name', 'year', 'series_letter', 'price', 'cars_per_case', 'stock', 'is_featured']
     list_filter = ['year', 'is_featured']
+    search_fields = ['name']
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ['price', 'stock', 'is_featured']
+    actions = ['change_price', 'restock', 'mark_featured', 'unmark_featured']
     form = type("HotWheelsCaseAdminForm", (_SlugOptionalFormMixin,), {"Meta": type("Meta", (), {"model": HotWheelsCase, "fields": "__all__"})})
 
     def save_model(self, request, obj, form, change):
@@ -99,25 +260,46 @@ class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
     readonly_fields = ['subtotal']
+    autocomplete_fields = ['product', 'case']
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(_LargeChangeListMixin, admin.ModelAdmin):
     list_display = ['id', 'user', 'status', 'total_price', 'created_at']
     list_filter = ['status', 'created_at']
+    list_select_related = ['user']
     search_fields = ['user__username', 'tracking_number']
+    autocomplete_fields = ['user']
     inlines = [OrderItemInline]
     list_editable = ['status']
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(_LargeChangeListMixin, admin.ModelAdmin):
     list_display = ['product', 'user', 'rating', 'title', 'created_at']
     list_filter = ['rating']
+    list_select_related = ['product', 'user']
+    autocomplete_fields = ['product', 'user']
+
+
+@admin.register(Cart)
+class CartAdmin(_LargeChangeListMixin, _CartOwnerMixin, admin.ModelAdmin):
+    autocomplete_fields = ['user']
+
+
+@admin.register(Wishlist)
+class WishlistAdmin(_LargeChangeListMixin, _CartOwnerMixin, admin.ModelAdmin):
+    readonly_fields = ['product_count']
+    autocomplete_fields = ['user', 'products']
 
+    def get_exclude(self, request, obj=None):
+        # The products widget reads through a join that can't cross into a
+        # separate cart database (see routers.py); saving it would wipe the list.
+        return ['products'] if routers.separate_cart_db() else []
 
-admin.site.register(Cart)
-admin.site.register(Wishlist)
+    @admin.display(description='Products')
+    def product_count(self, obj):
+        return len(obj.product_ids()) if obj.pk else 0
 
 # Customize admin site header
 admin.site.site_header = '🏁 Route66 Diecast Admin'
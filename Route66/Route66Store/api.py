@@ -0,0 +1,264 @@
+"""
+Read-only JSON API over the catalog, for the mobile app and partner feeds.
+
+    /api/products/?q=&category=&brand=&scale=&min_price=&max_price=&is_treasure_hunt=1&sort=price_asc
+    /api/products/<slug>/
+    /api/cases/          /api/cases/<slug>/
+    /api/categories/     /api/brands/
+
+Every endpoint takes ``fields=id,name,price`` to choose what comes back.
+The chosen fields map onto one ``.values()`` call, so rows arrive as dicts,
+no model instances are built and only the joins those fields need are made.
+Product lists take the storefront's filters and sorts
+(views.filter_product_list); all lists are paged with the storefront's
+keyset cursors (``cursor``, ``per_page``).
+
+List responses get an ETag hashed from the body, and anonymous requests for
+them go through the page cache. Detail responses reuse the row validators
+from conditional.py, so revalidating one costs a single indexed lookup.
+Bodies are encoded with orjson when it is installed.
+"""
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+from functools import wraps
+
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, set_response_etag
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from . import conditional, views
+from .models import Brand, Category, HotWheelsCase, Product
+from .page_cache import anonymous_page_cache
+from .pagination import paginate_request
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+CONTENT_TYPE = 'application/json'
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat().replace('+00:00', 'Z')
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    """payload as JSON bytes; decimals become strings and datetimes ISO 8601, the same with either encoder."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(payload, default=_encode_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def _money(value):
+    # SQLite hands computed decimals back without their scale
+    return None if value is None else value.quantize(Decimal('0.01'))
+
+
+def _detail_url(url_name):
+    return lambda slug: reverse(url_name, kwargs={'slug': slug})
+
+
+def _file_url(model, field):
+    storage = model._meta.get_field(field).storage
+    return lambda name: storage.url(name) if name else None
+
+
+class Resource:
+    """
+    A model as the API shows it. fields maps each public name to the ORM path
+    (or expression) it is read from; converters turn a read value into its
+    JSON form, e.g. a slug into the page URL.
+    """
+
+    def __init__(self, model, fields, default_fields, converters=None):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.converters = converters or {}
+
+    def parse_fields(self, request, default=None):
+        """The field names asked for with ``fields=``; raises ValueError on unknown names."""
+        raw = request.GET.get('fields', '')
+        if not raw:
+            return list(default or self.default_fields)
+        names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(
+                f"Unknown field(s): {', '.join(unknown) or '(none given)'}. Choose from: {', '.join(self.fields)}."
+            )
+        return names
+
+    def values(self, queryset, names, keys=()):
+        """queryset.values() reading names, plus keys (e.g. the cursor's sort keys)."""
+        paths = {self.fields[name] for name in names if isinstance(self.fields[name], str)}
+        expressions = {name: self.fields[name] for name in names if not isinstance(self.fields[name], str)}
+        return queryset.values(*sorted(paths.union(keys)), **expressions)
+
+    def to_json(self, row, names):
+        item = {}
+        for name in names:
+            source = self.fields[name]
+            value = row[source if isinstance(source, str) else name]
+            convert = self.converters.get(name)
+            item[name] = convert(value) if convert else value
+        return item
+
+
+PRODUCTS = Resource(
+    Product,
+    fields={
+        'id': 'id', 'name': 'name', 'slug': 'slug', 'url': 'slug',
+        'brand': 'brand__name', 'brand_id': 'brand_id', 'category': 'category__slug', 'scale': 'scale',
+        'price': 'price', 'sale_price': 'sale_price',
+        'display_price': Coalesce(
+            NullIf(F('sale_price'), Value(0)), F('price'), output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        'stock': 'stock', 'image': 'image', 'car_model': 'car_model', 'car_year': 'car_year', 'color': 'color',
+        'series': 'series', 'is_treasure_hunt': 'is_treasure_hunt', 'is_super_treasure_hunt': 'is_super_treasure_hunt',
+        'is_featured': 'is_featured', 'is_new_arrival': 'is_new_arrival',
+        'rating_avg': 'rating_avg', 'review_count': 'review_count', 'description': 'description',
+        'created_at': 'created_at', 'updated_at': 'updated_at',
+    },
+    # the same shape as the storefront's ?format=json listings (views._product_json)
+    default_fields=('id', 'name', 'slug', 'url', 'brand', 'scale', 'price', 'display_price', 'stock', 'image'),
+    converters={
+        'url': _detail_url('store:product_detail'), 'image': _file_url(Product, 'image'), 'display_price': _money,
+    },
+)
+
+CASES = Resource(
+    HotWheelsCase,
+    fields={
+        'id': 'id', 'name': 'name', 'slug': 'slug', 'url': 'slug', 'year': 'year', 'series_letter': 'series_letter',
+        'price': 'price', 'cars_per_case': 'cars_per_case', 'stock': 'stock', 'is_featured': 'is_featured',
+        'image': 'image', 'description': 'description', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    },
+    default_fields=('id', 'name', 'slug', 'url', 'year', 'series_letter', 'price', 'stock', 'image'),
+    converters={'url': _detail_url('store:case_detail'), 'image': _file_url(HotWheelsCase, 'image')},
+)
+
+CATEGORIES = Resource(
+    Category,
+    fields={
+        'id': 'id', 'name': 'name', 'slug': 'slug', 'url': 'slug', 'category_type': 'category_type',
+        'description': 'description', 'image': 'image',
+    },
+    default_fields=('id', 'name', 'slug', 'url', 'category_type'),
+    converters={'url': _detail_url('store:category_detail'), 'image': _file_url(Category, 'image')},
+)
+
+BRANDS = Resource(
+    Brand,
+    fields={'id': 'id', 'name': 'name', 'slug': 'slug', 'logo': 'logo', 'description': 'description'},
+    default_fields=('id', 'name', 'slug', 'logo'),
+    converters={'logo': _file_url(Brand, 'logo')},
+)
+
+
+def _json(payload, status=200):
+    return HttpResponse(dumps(payload), content_type=CONTENT_TYPE, status=status)
+
+
+def _error(message, status=400):
+    return _json({'error': message}, status=status)
+
+
+def _etag_from_body(view):
+    """ETag list responses by their body and answer matching If-None-Match with a 304."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        set_response_etag(response)
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(request, etag=response['ETag'], response=response)
+    return wrapper
+
+
+def _list(request, resource, queryset, ordering):
+    try:
+        names = resource.parse_fields(request)
+    except ValueError as error:
+        return _error(str(error))
+    rows = resource.values(queryset, names, keys=(ordering.lstrip('-'), 'id'))
+    page = paginate_request(request, rows, ordering)
+    return _json(page.as_json([resource.to_json(row, names) for row in page]))
+
+
+def _detail(request, resource, slug):
+    try:
+        names = resource.parse_fields(request, default=resource.fields)
+    except ValueError as error:
+        return _error(str(error))
+    found = conditional.row_validators(resource.model, slug)
+    if found is None:
+        return _error('Not found.', status=404)
+    digest, last_modified = found
+    variant = hashlib.md5(f"{digest}:{','.join(names)}".encode()).hexdigest()[:16]
+    etag = f'W/"api-{resource.model._meta.model_name}-{variant}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        row = resource.values(resource.model.objects.filter(slug=slug), names).first()
+        if row is None:
+            return _error('Not found.', status=404)
+        response = _json(resource.to_json(row, names))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_safe
+@_etag_from_body
+@anonymous_page_cache
+def product_list(request):
+    try:
+        products, ordering, _ = views.filter_product_list(request.GET)
+    except ValueError as error:
+        return _error(str(error))
+    return _list(request, PRODUCTS, products, ordering)
+
+
+@require_safe
+def product_detail(request, slug):
+    return _detail(request, PRODUCTS, slug)
+
+
+@require_safe
+@_etag_from_body
+@anonymous_page_cache
+def case_list(request):
+    return _list(request, CASES, HotWheelsCase.objects.filter(stock__gt=0), '-created_at')
+
+
+@require_safe
+def case_detail(request, slug):
+    return _detail(request, CASES, slug)
+
+
+@require_safe
+@_etag_from_body
+@anonymous_page_cache
+def category_list(request):
+    return _list(request, CATEGORIES, Category.objects.all(), 'name')
+
+
+@require_safe
+@_etag_from_body
+@anonymous_page_cache
+def brand_list(request):
+    return _list(request, BRANDS, Brand.objects.all(), 'name')
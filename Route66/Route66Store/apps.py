@@ -9,3 +9,7 @@ class StoreConfig(AppConfig):
     # database tables and migrations continue to work.
     label = 'store'
     verbose_name = 'Route66 Store'
+
+    def ready(self):
+        # Register model signal handlers (search index sync, etc.)
+        from . import signals  # noqa: F401
@@ -0,0 +1,149 @@
+"""
+Async versions of the read-only catalog views, served under ASGI.
+
+urls.py routes home, product_list, product_detail, search and cases_list here
+when ASYNC_CATALOG_VIEWS is on (Route66/asgi.py turns it on). Under ASGI a
+request waiting on the database no longer pins a worker thread, and home's
+independent queries run concurrently instead of one after another.
+
+Template rendering, keyset pagination and FTS lookups stay synchronous code
+and are called through sync_to_async; they share the filtering logic with
+views.py so both paths return the same pages.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render
+
+from . import search as catalog_search
+from . import recommendations, views, wishlists
+from .middleware import current_recorder, recording_queries
+from .models import Brand, Category, HotWheelsCase, Product
+from .conditional import conditional_detail
+from .page_cache import anonymous_page_cache
+from .pagination import paginate_request, wants_json
+
+arender = sync_to_async(render)
+
+
+def _in_worker(recorder, func, *args):
+    try:
+        # a fresh thread's connections carry no metrics wrapper of their own
+        with recording_queries(recorder):
+            return func(*args)
+    finally:
+        # runs in a pool thread with its own connection; don't leave it open
+        close_old_connections()
+
+
+async def run(func, *args):
+    """
+    Call func(*args) in its own worker thread so several calls can be
+    awaited together with asyncio.gather.
+    """
+    return await sync_to_async(_in_worker, thread_sensitive=False)(current_recorder(), func, *args)
+
+
+async def fetch(queryset):
+    """Evaluate queryset in its own worker thread (see run)."""
+    return await run(list, queryset)
+
+
+async def _grid_context(request):
+    # request.user is a lazy object that loads the session and user row
+    return await sync_to_async(lambda: wishlists.grid_context(request.user))()
+
+
+@anonymous_page_cache
+async def home(request):
+    querysets = views.home_querysets()
+    results, wishlist_context = await asyncio.gather(
+        asyncio.gather(*(fetch(qs) for qs in querysets.values())), _grid_context(request),
+    )
+    return await arender(request, 'store/home.html', {**dict(zip(querysets, results)), **wishlist_context})
+
+
+@anonymous_page_cache
+async def product_list(request):
+    def load_page():
+        products, ordering, selected = views.filter_product_list(request.GET)
+        return paginate_request(request, products, ordering), selected
+
+    try:
+        (page, selected), categories, brands, wishlist_context = await asyncio.gather(
+            sync_to_async(load_page)(), fetch(Category.objects.all()), fetch(Brand.objects.all()),
+            _grid_context(request),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error), content_type='text/plain; charset=utf-8')
+    if wants_json(request):
+        return JsonResponse(page.as_json([views._product_json(p) for p in page]))
+
+    context = {
+        'products': page,
+        'page': page,
+        'categories': categories,
+        'brands': brands,
+        **selected,
+        **wishlist_context,
+    }
+    return await arender(request, 'store/product_list.html', context)
+
+
+@conditional_detail(Product)
+@anonymous_page_cache
+async def product_detail(request, slug):
+    if request.method == 'POST':
+        # review submission is a write; keep it on the sync view
+        return await sync_to_async(views.product_detail)(request, slug)
+
+    try:
+        product = await Product.objects.select_related('brand').aget(slug=slug)
+    except Product.DoesNotExist:
+        raise Http404('No Product matches the given query.')
+
+    reviews, related, wishlist_context = await asyncio.gather(
+        sync_to_async(paginate_request)(
+            request, product.reviews.select_related('user'), '-created_at', per_page=10
+        ),
+        run(recommendations.related_products, product),
+        _grid_context(request),
+    )
+
+    context = {
+        'product': product,
+        'reviews': reviews,
+        'avg_rating': product.rating_avg if product.review_count else None,
+        'related': related,
+        'in_wishlist': product.id in (wishlist_context['wishlist_ids'] or ()),
+        'review_form': views.ReviewForm(),
+        **wishlist_context,
+    }
+    return await arender(request, 'store/product_detail.html', context)
+
+
+@anonymous_page_cache
+async def cases_list(request):
+    cases = HotWheelsCase.objects.filter(stock__gt=0)
+    page = await sync_to_async(paginate_request)(request, cases, '-created_at')
+    if wants_json(request):
+        return JsonResponse(page.as_json([views._case_json(c) for c in page]))
+    return await arender(request, 'store/cases_list.html', {'cases': page, 'page': page})
+
+
+async def search(request):
+    query = request.GET.get('q', '').strip()
+    page = await sync_to_async(catalog_search.search_page)(query, request.GET.get('cursor'))
+    page.build_urls(request)
+    products = [r for r in page if isinstance(r, Product)]
+    cases = [r for r in page if isinstance(r, HotWheelsCase)]
+    if wants_json(request):
+        return JsonResponse(page.as_json(
+            [dict(views._product_json(p), kind='product') if isinstance(p, Product)
+             else dict(views._case_json(p), kind='case') for p in page]
+        ))
+    return await arender(request, 'store/search_results.html', {
+        'query': query, 'results': page, 'page': page, 'products': products, 'cases': cases
+    })
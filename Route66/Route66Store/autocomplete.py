@@ -0,0 +1,436 @@
+"""
+Search-as-you-type suggestions for the header search box.
+
+Each worker process keeps an in-memory prefix index over the in-stock
+catalog: product names, car models, series, brand names and case names. It
+is a sorted list of (key, entry) pairs, where the keys of an entry are its
+normalized text starting at each word ("ferrari f40 blue", "f40 blue",
+"blue"). A suggestion lookup is two bisects for the [prefix, prefix + max)
+range plus a top-N pick by popularity, all without touching the database.
+Every prefix matching more than MEMO_RANGE keys is ranked when the index is
+built and memoized; a change re-ranks only the memoized prefixes of the keys
+it touched.
+
+Popularity: products and cases score on units sold and reviews; a car
+model, series or brand takes its best product's score plus a bonus for how
+many products share it.
+
+The index is built on first use (about a second per 50,000 products);
+later rebuilds run in a background thread. Saves and deletes of products,
+cases and brands update this process's index in place (signals.py) and bump
+a shared version in the cache, so other processes rebuild on their next
+check (at most every AUTOCOMPLETE_CHECK_SECONDS). Bulk updates that skip
+signals call catalog_changed(), which only bumps the version; anything else
+(stock reservations) shows up with the periodic rebuild every
+AUTOCOMPLETE_MAX_AGE seconds.
+"""
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Sum
+from django.urls import reverse
+
+from .models import Brand, HotWheelsCase, OrderItem, Product
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'autocomplete:version'
+# Keys per entry: the text from each of its first MAX_KEY_WORDS words
+MAX_KEY_WORDS = 6
+# Ranges wider than this are ranked once and memoized, MEMO_SIZE deep
+MEMO_RANGE = 256
+MEMO_SIZE = 20
+_END = '\U0010ffff'
+_WORD_RE = re.compile(r'\w+')
+
+KIND_PRODUCT, KIND_CASE, KIND_BRAND, KIND_MODEL, KIND_SERIES = 'product', 'case', 'brand', 'car_model', 'series'
+
+
+class Suggestion(namedtuple('Suggestion', 'text kind target score')):
+    """target: the slug of a product or case, a brand id, or the text itself for models and series."""
+    __slots__ = ()
+
+    def url(self):
+        if self.kind == KIND_PRODUCT:
+            return reverse('store:product_detail', kwargs={'slug': self.target})
+        if self.kind == KIND_CASE:
+            return reverse('store:case_detail', kwargs={'slug': self.target})
+        if self.kind == KIND_BRAND:
+            return f"{reverse('store:product_list')}?{urlencode({'brand': self.target})}"
+        return f"{reverse('store:search')}?{urlencode({'q': self.text})}"
+
+    def as_json(self):
+        return {'text': self.text, 'kind': self.kind, 'url': self.url()}
+
+
+def _limit():
+    return getattr(settings, 'AUTOCOMPLETE_LIMIT', 8)
+
+
+def _check_seconds():
+    return getattr(settings, 'AUTOCOMPLETE_CHECK_SECONDS', 30)
+
+
+def _max_age():
+    return getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 15 * 60)
+
+
+def normalize(text):
+    """Lowercase words without accents, single-spaced: 'Citroën  DS-19' -> 'citroen ds 19'."""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_WORD_RE.findall(text.lower()))
+
+
+def _keys(text):
+    words = normalize(text).split(' ')
+    return {' '.join(words[i:]) for i in range(min(len(words), MAX_KEY_WORDS)) if words[i]}
+
+
+def _popularity(units_sold, review_count=0, featured=False):
+    return 1 + 2 * math.log1p(units_sold) + math.log1p(review_count) + (0.5 if featured else 0)
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.keys = []          # sorted [(key, entry_id)]
+        self.entries = {}       # entry_id -> Suggestion
+        self.members = {}       # aggregate entry_id -> {product_id: score}
+        self.products = {}      # product_id -> (aggregate entry_ids, units sold)
+        self.case_units = {}    # case_id -> units sold
+        self.brand_names = {}   # brand_id -> name
+        self.memo = {}          # prefix -> ranked Suggestions, for wide ranges
+        self.stale = set()      # memoized prefixes dropped by changes, to re-rank
+        self.loading = None     # during build(): aggregate entry_id -> (text, kind, target), scored at the end
+        self.lock = threading.Lock()
+
+    # ── entries ─────────────────────────────────────────────────────────────
+
+    def _put(self, entry_id, suggestion):
+        if self.loading is not None:
+            # build() adds every entry once and sorts the keys at the end
+            self.entries[entry_id] = suggestion
+            self.keys.extend((key, entry_id) for key in _keys(suggestion.text))
+            return
+        old = self.entries.get(entry_id)
+        if old is not None and old.text == suggestion.text:
+            self.entries[entry_id] = suggestion
+            if old.score != suggestion.score:
+                self._invalidate(_keys(old.text))
+            return
+        if old is not None:
+            self._drop(entry_id)
+        self.entries[entry_id] = suggestion
+        keys = _keys(suggestion.text)
+        for key in keys:
+            bisect.insort(self.keys, (key, entry_id))
+        self._invalidate(keys)
+
+    def _drop(self, entry_id):
+        old = self.entries.pop(entry_id, None)
+        if old is None:
+            return
+        keys = _keys(old.text)
+        for key in keys:
+            at = bisect.bisect_left(self.keys, (key, entry_id))
+            if at < len(self.keys) and self.keys[at] == (key, entry_id):
+                del self.keys[at]
+        self._invalidate(keys)
+
+    def _invalidate(self, keys):
+        for prefix in [prefix for prefix in self.memo if any(key.startswith(prefix) for key in keys)]:
+            del self.memo[prefix]
+            self.stale.add(prefix)
+
+    def _rescore(self, entry_id, text, kind, target):
+        members = self.members.get(entry_id)
+        if not members:
+            self.members.pop(entry_id, None)
+            self._drop(entry_id)
+            return
+        score = max(members.values()) + math.log1p(len(members))
+        self._put(entry_id, Suggestion(text, kind, target, score))
+
+    def _aggregates(self, row):
+        """(entry_id, text, kind, target) for the car model, series and brand of a product row."""
+        found = []
+        for kind, text in ((KIND_MODEL, row['car_model']), (KIND_SERIES, row['series'])):
+            key = normalize(text)
+            if key:
+                found.append((f'{kind}:{key}', text.strip(), kind, text.strip()))
+        name = self.brand_names.get(row['brand_id'])
+        if name:
+            found.append((f"{KIND_BRAND}:{row['brand_id']}", name, KIND_BRAND, row['brand_id']))
+        return found
+
+    def set_product(self, row, units_sold=None):
+        """Add or refresh one product from a dict of its fields (see _PRODUCT_FIELDS); units_sold defaults to the last known."""
+        self.remove_product(row['id'], keep_units=True)
+        if row['stock'] <= 0:
+            return
+        if units_sold is None:
+            units_sold = self.products.get(row['id'], ((), 0))[1]
+        score = _popularity(units_sold, row['review_count'], row['is_featured'])
+        self._put(f"{KIND_PRODUCT}:{row['id']}", Suggestion(row['name'], KIND_PRODUCT, row['slug'], score))
+        aggregates = self._aggregates(row)
+        for entry_id, text, kind, target in aggregates:
+            self.members.setdefault(entry_id, {})[row['id']] = score
+            if self.loading is not None:
+                self.loading.setdefault(entry_id, (text, kind, target))
+                continue
+            existing = self.entries.get(entry_id)
+            self._rescore(entry_id, existing.text if existing else text, kind, target)
+        self.products[row['id']] = (tuple(entry_id for entry_id, *_ in aggregates), units_sold)
+
+    def remove_product(self, product_id, keep_units=False):
+        self._drop(f'{KIND_PRODUCT}:{product_id}')
+        aggregates, units_sold = self.products.pop(product_id, ((), 0))
+        for entry_id in aggregates:
+            members = self.members.get(entry_id, {})
+            members.pop(product_id, None)
+            existing = self.entries.get(entry_id)
+            if existing is not None:
+                self._rescore(entry_id, existing.text, existing.kind, existing.target)
+        if keep_units:
+            self.products[product_id] = ((), units_sold)
+
+    def set_case(self, row, units_sold=None):
+        entry_id = f"{KIND_CASE}:{row['id']}"
+        if units_sold is not None:
+            self.case_units[row['id']] = units_sold
+        if row['stock'] <= 0:
+            self._drop(entry_id)
+            return
+        score = _popularity(self.case_units.get(row['id'], 0))
+        self._put(entry_id, Suggestion(row['name'], KIND_CASE, row['slug'], score))
+
+    def remove_case(self, case_id):
+        self._drop(f'{KIND_CASE}:{case_id}')
+
+    def set_brand(self, brand_id, name):
+        self.brand_names[brand_id] = name
+        entry_id = f'{KIND_BRAND}:{brand_id}'
+        existing = self.entries.get(entry_id)
+        if existing is not None:
+            self._put(entry_id, existing._replace(text=name))
+
+    def remove_brand(self, brand_id):
+        self.brand_names.pop(brand_id, None)
+        self.members.pop(f'{KIND_BRAND}:{brand_id}', None)
+        self._drop(f'{KIND_BRAND}:{brand_id}')
+
+    # ── lookups ─────────────────────────────────────────────────────────────
+
+    def suggest(self, query, limit):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        memoized = self.memo.get(prefix)
+        if memoized is not None and limit <= MEMO_SIZE:
+            return memoized[:limit]
+        lo, hi = self._range(prefix)
+        wide = hi - lo > MEMO_RANGE
+        ranked = self._rank({entry_id for _, entry_id in self.keys[lo:hi]}, max(limit, MEMO_SIZE) if wide else limit)
+        if wide:
+            self.memo[prefix] = ranked
+        return ranked[:limit]
+
+    def _rank(self, entry_ids, limit):
+        """The limit best entries, one per kind and text (several products can share a name)."""
+        candidates = [self.entries[entry_id] for entry_id in entry_ids]
+        for depth in (limit * 2, len(candidates)):
+            ranked, seen = [], set()
+            for suggestion in heapq.nlargest(depth, candidates, key=lambda suggestion: suggestion.score):
+                if (suggestion.kind, suggestion.text.casefold()) not in seen:
+                    seen.add((suggestion.kind, suggestion.text.casefold()))
+                    ranked.append(suggestion)
+            if len(ranked) >= limit or depth >= len(candidates):
+                return ranked[:limit]
+
+    def finish_loading(self):
+        """Score the aggregates collected during build() and sort the keys."""
+        for entry_id, (text, kind, target) in self.loading.items():
+            self._rescore(entry_id, text, kind, target)
+        self.keys.sort()
+        self.loading = None
+        self._warm_all()
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self.keys, (prefix,))
+        return lo, bisect.bisect_left(self.keys, (prefix + _END,), lo)
+
+    def _warm_all(self):
+        """Memoize every wide prefix: the first letters, then one letter longer while still wide."""
+        pending = sorted({key[:1] for key, _ in self.keys})
+        while pending:
+            prefix = pending.pop()
+            lo, hi = self._range(prefix)
+            if hi - lo <= MEMO_RANGE:
+                continue
+            self.memo[prefix] = self._rank({entry_id for _, entry_id in self.keys[lo:hi]}, MEMO_SIZE)
+            pending.extend({key[:len(prefix) + 1] for key, _ in self.keys[lo:hi] if len(key) > len(prefix)})
+
+    def warm(self, prefixes):
+        """Rank and memoize the wide ones among prefixes."""
+        for prefix in prefixes:
+            self.suggest(prefix, MEMO_SIZE)
+        self.stale.clear()
+
+
+_PRODUCT_FIELDS = ('id', 'name', 'slug', 'car_model', 'series', 'brand_id', 'stock', 'review_count', 'is_featured')
+_CASE_FIELDS = ('id', 'name', 'slug', 'stock')
+
+
+def _units_sold(field):
+    lines = OrderItem.objects.filter(**{f'{field}__isnull': False})
+    return dict(lines.order_by().values_list(field).annotate(units=Sum('quantity')))
+
+
+def build():
+    """A fresh PrefixIndex over the in-stock catalog."""
+    index = PrefixIndex()
+    index.loading = {}
+    index.brand_names = dict(Brand.objects.values_list('id', 'name'))
+    product_units = _units_sold('product_id')
+    for row in Product.objects.filter(stock__gt=0).values(*_PRODUCT_FIELDS).iterator(chunk_size=5000):
+        index.set_product(row, product_units.get(row['id'], 0))
+    case_units = _units_sold('case_id')
+    for row in HotWheelsCase.objects.filter(stock__gt=0).values(*_CASE_FIELDS).iterator(chunk_size=5000):
+        index.set_case(row, case_units.get(row['id'], 0))
+    index.finish_loading()
+    return index
+
+
+class _State:
+    index = None
+    version = None
+    built_at = 0.0
+    checked_at = 0.0
+    rebuilding = False
+
+
+_state = _State()
+_build_lock = threading.Lock()
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+def _bump_shared_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+        return 2
+
+
+def _rebuild(version, started):
+    try:
+        _state.index = build()
+        _state.version = version
+        _state.built_at = started
+    finally:
+        _state.rebuilding = False
+
+
+def _rebuild_in_background(version, started):
+    try:
+        _rebuild(version, started)
+    except Exception:
+        logger.exception('Rebuilding the search suggestion index failed')
+    finally:
+        connections.close_all()
+
+
+def current_index():
+    """
+    This process's index. The first call builds it; once it is too old or
+    another process changed the catalog, it is rebuilt in a background thread
+    while the current one keeps answering.
+    """
+    now = time.monotonic()
+    if _state.index is not None and now - _state.checked_at < _check_seconds():
+        return _state.index
+    with _build_lock:
+        if _state.index is not None and now - _state.checked_at < _check_seconds():
+            return _state.index
+        _state.checked_at = now
+        version = _shared_version()
+        if _state.index is None:
+            _rebuild(version, now)
+        elif (version != _state.version or now - _state.built_at > _max_age()) and not _state.rebuilding:
+            _state.rebuilding = True
+            threading.Thread(
+                target=_rebuild_in_background, args=(version, now), name='autocomplete-rebuild', daemon=True,
+            ).start()
+    return _state.index
+
+
+def suggest(query, limit=None):
+    """The top suggestions for what has been typed so far, most popular first."""
+    index = current_index()
+    with index.lock:
+        return index.suggest(query, limit or _limit())
+
+
+def _apply(change):
+    """Apply change(index) to this process's index, if built, and tell the other processes."""
+    version = _bump_shared_version()
+    index = _state.index
+    if index is None:
+        return
+    with index.lock:
+        change(index)
+        index.warm(list(index.stale))
+    if version == (_state.version or 0) + 1:
+        # nobody else changed anything since this index was built
+        _state.version = version
+
+
+def catalog_changed():
+    """Have every process rebuild its index soon, after a change that bypassed the signals."""
+    _bump_shared_version()
+
+
+def product_saved(product):
+    row = {field: getattr(product, field) for field in _PRODUCT_FIELDS}
+    _apply(lambda index: index.set_product(row))
+
+
+def product_deleted(product_id):
+    _apply(lambda index: index.remove_product(product_id))
+
+
+def case_saved(case):
+    row = {field: getattr(case, field) for field in _CASE_FIELDS}
+    _apply(lambda index: index.set_case(row))
+
+
+def case_deleted(case_id):
+    _apply(lambda index: index.remove_case(case_id))
+
+
+def brand_saved(brand):
+    _apply(lambda index: index.set_brand(brand.id, brand.name))
+
+
+def brand_deleted(brand_id):
+    _apply(lambda index: index.remove_brand(brand_id))
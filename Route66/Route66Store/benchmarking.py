@@ -0,0 +1,103 @@
+"""
+Shared helpers for the benchmark management commands.
+"""
+import json
+import math
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+from . import routers
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction on every writable database, then roll them all back."""
+    aliases = sorted({DEFAULT_DB_ALIAS, routers.cart_db()})
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+        for alias in aliases:
+            transaction.set_rollback(True, using=alias)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of samples (pct in 0-100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies_ms, query_counts):
+    return {
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+        'queries': max(query_counts) if query_counts else 0,
+        'runs': len(latencies_ms),
+    }
+
+
+def measure(func, iterations, warmup=1, setup=None):
+    """
+    Call func() iterations times (after warmup calls) and return
+    (latencies_ms, query_counts, last_result). setup() runs untimed
+    before every call. Queries are counted on every configured database
+    (default, replica, carts).
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+    latencies, queries, result = [], [], None
+    for _ in range(iterations):
+        if setup:
+            setup()
+        with ExitStack() as stack:
+            captured = [stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()]
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        latencies.append(elapsed * 1000)
+        queries.append(sum(len(context) for context in captured))
+    return latencies, queries, result
+
+
+def load_baseline(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_baseline(path, results):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+
+def compare(results, baseline, latency_threshold, query_threshold=0):
+    """
+    Return a list of human-readable regressions: p95 latency more than
+    latency_threshold (a fraction, e.g. 0.2 for +20%) above baseline, or more
+    than query_threshold extra queries.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        limit = before['p95_ms'] * (1 + latency_threshold)
+        if current['p95_ms'] > limit:
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']:.1f}ms > {before['p95_ms']:.1f}ms "
+                f"(+{latency_threshold:.0%} allowed)"
+            )
+        if current['queries'] > before['queries'] + query_threshold:
+            regressions.append(f"{name}: {current['queries']} queries > {before['queries']} in baseline")
+    return regressions
@@ -0,0 +1,253 @@
+"""
+Cart storage behind the cart views.
+
+Members keep their cart in the Cart/CartItem tables. Guests keep theirs in a
+signed cookie (settings.GUEST_CART_COOKIE) holding only item ids and
+quantities, so filling a cart anonymously never writes to the database;
+prices and stock are always read fresh from the catalog. When a guest signs
+in, merge_guest_cart() folds the cookie into their member cart with one bulk
+insert and one bulk update, and drops the cookie.
+
+Every member-cart write runs in a transaction on the cart database, which
+the performance SQLite profile starts with BEGIN IMMEDIATE (sqlite.py), as
+the cart views' write_transaction did before guest carts moved to cookies.
+
+Both stores hand out CartItem instances with product/case loaded, so the
+templates and lines_total() treat guest and member lines alike. Guest lines
+are unsaved; their line_id ('p12', 'c3') names the item instead of a row.
+
+    cart = cart_store.for_request(request)
+    cart.add(product)
+    return cart.save(redirect('store:cart'))   # guests: writes the cookie
+"""
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from . import cart_summary, routers
+from .models import Cart, CartItem, HotWheelsCase, Product
+from .orders import cart_lines
+
+COOKIE_SALT = 'route66.guest-cart'
+
+_LINE_ID_RE = re.compile(r'^([pc])(\d+)$')
+
+
+class CartFullError(Exception):
+    """A guest cart already holds GUEST_CART_MAX_LINES different items."""
+
+
+def cookie_name():
+    return getattr(settings, 'GUEST_CART_COOKIE', 'r66_cart')
+
+
+def _max_age():
+    return getattr(settings, 'GUEST_CART_MAX_AGE', 30 * 24 * 60 * 60)
+
+
+def _max_lines():
+    return getattr(settings, 'GUEST_CART_MAX_LINES', 50)
+
+
+def _lookup(stock_item):
+    if isinstance(stock_item, Product):
+        return {'product': stock_item, 'case': None}
+    return {'case': stock_item, 'product': None}
+
+
+def for_request(request):
+    if request.user.is_authenticated:
+        return MemberCart(request.user)
+    return GuestCart(request)
+
+
+class MemberCart:
+    def __init__(self, user):
+        self.user = user
+
+    def _cart(self):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        return cart
+
+    def count(self):
+        return cart_summary.get_summary(self.user)['count']
+
+    def lines(self):
+        return cart_lines(self._cart())
+
+    def line(self, line_id):
+        if not line_id.isdigit():
+            raise Http404('No such cart line.')
+        lines = routers.with_catalog(CartItem.objects.all(), 'product', 'case')
+        return get_object_or_404(lines, id=line_id, cart__user=self.user)
+
+    def add(self, stock_item):
+        """Add one stock_item. False when the cart already holds all of its stock."""
+        with transaction.atomic(using=routers.cart_db()):
+            item, created = CartItem.objects.get_or_create(cart=self._cart(), **_lookup(stock_item))
+            if not created:
+                if item.quantity >= stock_item.stock:
+                    return False
+                item.quantity += 1
+                item.save()
+        cart_summary.invalidate(self.user)
+        return True
+
+    def set_quantity(self, line, quantity):
+        with transaction.atomic(using=routers.cart_db()):
+            if quantity < 1:
+                line.delete()
+            else:
+                line.quantity = quantity
+                line.save()
+        cart_summary.invalidate(self.user)
+
+    def remove(self, line):
+        with transaction.atomic(using=routers.cart_db()):
+            line.delete()
+        cart_summary.invalidate(self.user)
+
+    def merge(self, guest_lines):
+        """Add guest_lines to this cart, capped at stock, in one bulk insert and one bulk update."""
+        if not guest_lines:
+            return
+        with transaction.atomic(using=routers.cart_db()):
+            cart = self._cart()
+            existing = {(item.product_id, item.case_id): item for item in cart.cartitem_set.all()}
+            created, updated = [], []
+            for line in guest_lines:
+                stock = (line.product or line.case).stock
+                item = existing.get((line.product_id, line.case_id))
+                if item is None:
+                    line.cart = cart
+                    line.quantity = min(line.quantity, stock)
+                    if line.quantity > 0:
+                        created.append(line)
+                else:
+                    quantity = max(item.quantity, min(item.quantity + line.quantity, stock))
+                    if quantity != item.quantity:
+                        item.quantity = quantity
+                        updated.append(item)
+            CartItem.objects.bulk_create(created)
+            CartItem.objects.bulk_update(updated, ['quantity'])
+        cart_summary.invalidate(self.user)
+
+    def save(self, response):
+        return response
+
+
+class GuestCart:
+    """
+    Cookie-backed cart. The cookie value is 'p12:2,c3:1' (item kind and id,
+    quantity), signed so a tampered cookie reads as an empty cart.
+    """
+
+    def __init__(self, request):
+        self.changed = False
+        self.quantities = self._decode(request.get_signed_cookie(
+            cookie_name(), default='', salt=COOKIE_SALT, max_age=_max_age(),
+        ))
+
+    @staticmethod
+    def _decode(value):
+        quantities = {}
+        for part in value.split(','):
+            line_id, _, quantity = part.partition(':')
+            if _LINE_ID_RE.match(line_id) and quantity.isdigit() and int(quantity) > 0:
+                quantities[line_id] = int(quantity)
+        return quantities
+
+    def _encode(self):
+        return ','.join(f'{line_id}:{quantity}' for line_id, quantity in self.quantities.items())
+
+    def _existing(self, objects=True):
+        """
+        {'p': ..., 'c': ...} of the products and cases still in the catalog,
+        keyed by id (objects) or a set of ids. Lines whose item has been
+        deleted are dropped here, so count(), lines() and the merge at login
+        all see the same cart; save() then rewrites the cookie without them.
+        """
+        ids = {'p': [], 'c': []}
+        for line_id in self.quantities:
+            ids[line_id[0]].append(int(line_id[1:]))
+        existing = {}
+        for kind, model in (('p', Product), ('c', HotWheelsCase)):
+            rows = model.objects.filter(id__in=ids[kind])
+            if not ids[kind]:
+                existing[kind] = {}
+            elif objects:
+                existing[kind] = rows.in_bulk()
+            else:
+                existing[kind] = set(rows.values_list('id', flat=True))
+        gone = [line_id for line_id in self.quantities if int(line_id[1:]) not in existing[line_id[0]]]
+        for line_id in gone:
+            del self.quantities[line_id]
+        self.changed = self.changed or bool(gone)
+        return existing
+
+    def count(self):
+        if self.quantities:
+            self._existing(objects=False)
+        return sum(self.quantities.values())
+
+    def lines(self):
+        items = self._existing()
+        return [
+            CartItem(quantity=quantity, **_lookup(items[line_id[0]][int(line_id[1:])]))
+            for line_id, quantity in self.quantities.items()
+        ]
+
+    def line(self, line_id):
+        match = _LINE_ID_RE.match(line_id)
+        if not match or line_id not in self.quantities:
+            raise Http404('No such cart line.')
+        model = Product if match.group(1) == 'p' else HotWheelsCase
+        stock_item = get_object_or_404(model, id=match.group(2))
+        return CartItem(quantity=self.quantities[line_id], **_lookup(stock_item))
+
+    def add(self, stock_item):
+        """Add one stock_item. False when the cart already holds all of its stock."""
+        line_id = CartItem(**_lookup(stock_item)).line_id
+        quantity = self.quantities.get(line_id, 0)
+        if quantity >= stock_item.stock:
+            return False
+        if not quantity and len(self.quantities) >= _max_lines():
+            raise CartFullError(line_id)
+        self.quantities[line_id] = quantity + 1
+        self.changed = True
+        return True
+
+    def set_quantity(self, line, quantity):
+        if quantity < 1:
+            self.remove(line)
+        else:
+            self.quantities[line.line_id] = quantity
+            self.changed = True
+
+    def remove(self, line):
+        self.quantities.pop(line.line_id, None)
+        self.changed = True
+
+    def save(self, response):
+        if not self.changed:
+            return response
+        if self.quantities:
+            response.set_signed_cookie(
+                cookie_name(), self._encode(), salt=COOKIE_SALT,
+                max_age=_max_age(), httponly=True, samesite='Lax',
+            )
+        else:
+            response.delete_cookie(cookie_name(), samesite='Lax')
+        return response
+
+
+def merge_guest_cart(request, response):
+    """Call right after login(): move the guest cookie cart into the member's cart."""
+    if cookie_name() not in request.COOKIES:
+        return response
+    MemberCart(request.user).merge(GuestCart(request).lines())
+    response.delete_cookie(cookie_name(), samesite='Lax')
+    return response
@@ -0,0 +1,86 @@
+"""
+Per-user cart summary (item count and total) for the site-wide cart badge.
+
+Summaries are computed with one aggregate query (or from the loaded lines
+when carts live in their own database) and cached under a per-user
+version number. Every CartItem write path calls ``invalidate()``, which bumps
+the version so the next read recomputes; stale entries simply expire.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from . import routers
+from .models import CartItem
+
+EMPTY_SUMMARY = {'count': 0, 'total': Decimal('0.00')}
+
+
+def _timeout():
+    return getattr(settings, 'CART_SUMMARY_TIMEOUT', 60 * 60)
+
+
+def _version_key(user_id):
+    return f'cart:version:{user_id}'
+
+
+def _summary_key(user_id, version):
+    return f'cart:summary:{user_id}:{version}'
+
+
+def _version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(user_id), version, None)
+    return version
+
+
+def compute_summary(user_id):
+    """One aggregate query over the user's cart lines."""
+    lines = CartItem.objects.filter(cart__user_id=user_id)
+    if lines.db != routers.catalog_db():
+        # prices live in another database; add them up here instead
+        lines = list(routers.with_catalog(lines, 'product', 'case'))
+        if not lines:
+            return dict(EMPTY_SUMMARY)
+        total = sum((line.subtotal for line in lines), Decimal(0))
+        return {'count': sum(line.quantity for line in lines), 'total': total.quantize(Decimal('0.01'))}
+
+    money = DecimalField(max_digits=12, decimal_places=2)
+    unit_price = Coalesce(
+        NullIf(F('product__sale_price'), Value(0)), F('product__price'), F('case__price'),
+        output_field=money,
+    )
+    stats = lines.aggregate(
+        count=Sum('quantity'),
+        total=Sum(unit_price * F('quantity'), output_field=money),
+    )
+    if not stats['count']:
+        return dict(EMPTY_SUMMARY)
+    total = Decimal(stats['total'] or 0).quantize(Decimal('0.01'))
+    return {'count': stats['count'], 'total': total}
+
+
+def get_summary(user):
+    """Return {'count': int, 'total': Decimal} for user's cart."""
+    if not user.is_authenticated:
+        return dict(EMPTY_SUMMARY)
+    key = _summary_key(user.pk, _version(user.pk))
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_summary(user.pk)
+        cache.set(key, summary, _timeout())
+    return summary
+
+
+def invalidate(user):
+    """Call after any write to user's cart lines."""
+    key = _version_key(user.pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
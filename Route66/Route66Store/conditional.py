@@ -0,0 +1,98 @@
+"""
+Conditional GET (ETag / Last-Modified) for the product and case detail pages.
+
+The validators come from one narrow query on the page's row, looked up by its
+unique slug: id, updated_at, stock and, for products, the denormalized review
+count and the updated_at of the brand and category the page names. updated_at
+moves on every save, rating refresh (models.py) and stock change
+(reservations.py), and Last-Modified is the latest of them, so a matching
+If-None-Match or If-Modified-Since is answered with a 304 before the page
+cache or the view runs.
+
+Only requests that get the shared anonymous page (page_cache.is_shared_request)
+are validated; a signed-in shopper's page carries their cart and wishlist,
+which the row knows nothing about. The ETag is weak: navigation and the
+related-products strip can change without the row changing.
+"""
+import hashlib
+from calendar import timegm
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import page_cache
+
+_FIELDS = {
+    'product': ('id', 'updated_at', 'stock', 'review_count', 'brand__updated_at', 'category__updated_at'),
+    'hotwheelscase': ('id', 'updated_at', 'stock'),
+}
+
+
+def row_validators(model, slug):
+    """(digest, last_modified timestamp) of model's row at slug from one narrow query, or None."""
+    row = model.objects.filter(slug=slug).values_list(*_FIELDS[model._meta.model_name]).first()
+    if row is None:
+        return None
+    last_modified = max(value for value in row if isinstance(value, datetime))
+    return hashlib.md5(repr(row).encode()).hexdigest()[:16], timegm(last_modified.utctimetuple())
+
+
+def validators(request, model, slug):
+    """(etag, last_modified timestamp) for model's page at slug, or None when not validated."""
+    if request.method not in ('GET', 'HEAD') or not page_cache.is_shared_request(request):
+        return None
+    found = row_validators(model, slug)
+    if found is None:
+        return None  # the view raises the 404
+    digest, last_modified = found
+    return f'W/"{model._meta.model_name}-{digest}"', last_modified
+
+
+def _not_modified(request, found):
+    if found is None:
+        return None
+    etag, last_modified = found
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def _finish(request, found, response):
+    if found is None or request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    etag, last_modified = found
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', http_date(last_modified))
+    # Revalidate on every visit instead of trusting a heuristic lifetime
+    # derived from Last-Modified; a revalidation costs one indexed lookup.
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_detail(model):
+    """
+    Answer conditional GETs of a detail view (sync or async) taking ``slug``
+    with 304s. Goes outside anonymous_page_cache, so a 304 skips both.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, slug, **kwargs):
+                found = await sync_to_async(validators)(request, model, slug)
+                response = _not_modified(request, found)
+                if response is None:
+                    response = _finish(request, found, await view(request, slug, **kwargs))
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, slug, **kwargs):
+            found = validators(request, model, slug)
+            response = _not_modified(request, found)
+            if response is None:
+                response = _finish(request, found, view(request, slug, **kwargs))
+            return response
+        return wrapper
+    return decorator
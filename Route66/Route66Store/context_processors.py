@@ -1,12 +1,5 @@
-from .models import Cart
+from . import cart_store
 
 
 def cart_count(request):
-    count = 0
-    if request.user.is_authenticated:
-        try:
-            cart = Cart.objects.get(user=request.user)
-            count = cart.item_count
-        except Cart.DoesNotExist:
-            pass
-    return {'cart_count': count}
+    return {'cart_count': cart_store.for_request(request).count()}
@@ -2,7 +2,8 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from .models import Review
+from . import exports
+from .models import Order, Review
 
 
 class SignUpForm(UserCreationForm):
@@ -60,3 +61,18 @@ class CheckoutForm(forms.Form):
     zip_code = forms.CharField(max_length=20)
     country = forms.CharField(max_length=100, initial='India')
     notes = forms.CharField(widget=forms.Textarea(attrs={'rows': 2}), required=False)
+
+
+class OrderExportForm(forms.Form):
+    """Query parameters of the staff order export (views.export_orders)."""
+    format = forms.ChoiceField(choices=[(name, name) for name in exports.FORMATS], required=False)
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+    status = forms.MultipleChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    after_id = forms.IntegerField(min_value=0, required=False)
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get('since') and cleaned.get('until') and cleaned['since'] > cleaned['until']:
+            raise ValidationError("since must not be after until.")
+        return cleaned
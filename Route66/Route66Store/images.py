@@ -0,0 +1,184 @@
+"""
+Responsive image derivatives.
+
+Every uploaded catalog image gets resized copies at fixed widths in WebP and
+JPEG, stored next to the media root under ``derivatives/``. Generation runs in
+a process pool after the saving transaction commits, so uploads never wait on
+Pillow. Images are never upscaled: only the widths up to the source's own
+width are written. The ``responsive_img`` template tag
+(templatetags/store_images.py) emits ``srcset`` attributes listing those
+widths once they exist.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_DIR = 'derivatives'
+FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 4},
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+# (model label, image field names) for everything that gets derivatives
+IMAGE_FIELDS = {
+    'store.Product': ('image', 'image2', 'image3'),
+    'store.HotWheelsCase': ('image',),
+    'store.Brand': ('logo',),
+    'store.Category': ('image',),
+}
+
+_executor = None
+
+
+def widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (160, 320, 640)))
+
+
+def derivative_name(name, width, ext):
+    """'products/foo.jpg' -> 'derivatives/products/foo-320.webp'"""
+    base, _ = os.path.splitext(name)
+    return f"{DERIVATIVE_DIR}/{base}-{width}.{ext}"
+
+
+def derivative_url(name, width, ext):
+    return f"{settings.MEDIA_URL}{derivative_name(name, width, ext)}"
+
+
+def source_widths(name, sizes, media_root=None):
+    """The sizes no wider than the source image, ascending; None if it is missing."""
+    from PIL import Image
+
+    source = os.path.join(str(media_root or settings.MEDIA_ROOT), name)
+    try:
+        with Image.open(source) as image:  # reads the header only
+            # render_derivatives applies the EXIF rotation first
+            width = image.height if image.getexif().get(0x0112) in (5, 6, 7, 8) else image.width
+    except (OSError, ValueError):
+        return None
+    return tuple(w for w in sorted(sizes) if w <= width)
+
+
+def has_derivatives(name, media_root=None):
+    """
+    True once the largest derivative of name exists (it is written last), or
+    when the source is narrower than every width and gets none.
+    """
+    fitting = source_widths(name, widths(), media_root)
+    return fitting is not None and _written(str(media_root or settings.MEDIA_ROOT), name, fitting)
+
+
+def _written(media_root, name, fitting):
+    return not fitting or os.path.exists(os.path.join(media_root, derivative_name(name, fitting[-1], 'jpg')))
+
+
+class _NotReady(Exception):
+    pass
+
+
+@lru_cache(maxsize=4096)
+def _ready_widths(media_root, name, sizes):
+    # Raising keeps "not generated yet" out of the cache, so the tag notices
+    # the derivatives as soon as the worker has written them.
+    fitting = source_widths(name, sizes, media_root)
+    if fitting is None or not _written(media_root, name, fitting):
+        raise _NotReady
+    return fitting
+
+
+def ready_widths(name):
+    """
+    The derivative widths of name to list in a srcset, () until they have
+    been generated. Cached per process: uploads get fresh names, so once an
+    image's derivatives exist they stay put.
+    """
+    try:
+        return _ready_widths(str(settings.MEDIA_ROOT), name, widths())
+    except _NotReady:
+        return ()
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white."""
+    from PIL import Image
+
+    if image.mode != 'RGBA':
+        return image.convert('RGB')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_derivatives(media_root, name, sizes, force=False):
+    """
+    Write every derivative of one image. Runs in worker processes, so it only
+    takes plain arguments and touches the filesystem, not the database.
+    Returns the number of files written.
+    """
+    from PIL import Image, ImageOps
+
+    source = os.path.join(media_root, name)
+    if not os.path.exists(source):
+        return 0
+    written = 0
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            alpha = original.mode in ('LA', 'PA') or 'transparency' in original.info
+            original = original.convert('RGBA' if alpha else 'RGB')
+        for width in sorted(w for w in sizes if w <= original.width):
+            resized = original.copy()
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            for ext, fmt in FORMATS.items():
+                target = os.path.join(media_root, derivative_name(name, width, ext))
+                if not force and os.path.exists(target):
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                image = _flatten(resized) if fmt == 'JPEG' else resized
+                tmp = f"{target}.tmp"
+                image.save(tmp, fmt, **SAVE_OPTIONS[fmt])
+                os.replace(tmp, target)
+                written += 1
+    return written
+
+
+def render_safely(media_root, name, sizes, force=False):
+    try:
+        return render_derivatives(media_root, name, sizes, force)
+    except Exception:
+        logger.exception('Could not build derivatives for %s', name)
+        return 0
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2)
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def image_names(instance):
+    fields = IMAGE_FIELDS.get(instance._meta.label, ())
+    return [getattr(instance, f).name for f in fields if getattr(instance, f)]
+
+
+def schedule(instance):
+    """Queue derivative generation for instance's images once the save commits."""
+    names = [n for n in image_names(instance) if not has_derivatives(n)]
+    if not names:
+        return
+    media_root = str(settings.MEDIA_ROOT)
+
+    def submit():
+        executor = get_executor()
+        for name in names:
+            executor.submit(render_safely, media_root, name, widths())
+
+    transaction.on_commit(submit)
@@ -0,0 +1,174 @@
+"""
+Throughput of the catalog pages under concurrent load, WSGI vs ASGI.
+
+    python manage.py generate_catalog --products 100000
+    python manage.py benchmark_concurrency --concurrency 32 --requests 600
+
+The WSGI run calls the project's WSGI handler from a pool of ``--concurrency``
+threads with the sync views, like a threaded WSGI server. The ASGI run keeps
+``--concurrency`` requests in flight on one event loop against the ASGI handler
+with the async views (ASYNC_CATALOG_VIEWS), like a single uvicorn/daphne
+worker. Both go through the full middleware stack in-process, so the numbers
+leave out socket and HTTP parsing costs but compare the two request paths
+like for like. The page cache is switched off for both.
+"""
+import asyncio
+import importlib
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+
+from Route66Store import benchmarking
+from Route66Store.models import Product
+
+
+def use_async_views(enabled):
+    """Re-import the URLconfs so they pick up ASYNC_CATALOG_VIEWS."""
+    with override_settings(ASYNC_CATALOG_VIEWS=enabled):
+        importlib.reload(importlib.import_module('Route66Store.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+def wsgi_get(app, path, query):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver', 'HTTP_HOST': 'testserver', 'wsgi.input': BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    status = []
+    start = time.perf_counter()
+    response = app(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return status[0], (time.perf_counter() - start) * 1000
+
+
+async def asgi_get(app, path, query):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # the client never disconnects; Django cancels this once it responds
+        await asyncio.Future()
+
+    status = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return status[0], (time.perf_counter() - start) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compare catalog throughput under concurrent load: threaded WSGI vs ASGI with async views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per mode.')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        product = Product.objects.filter(stock__gt=0).order_by('id').first()
+        if product is None:
+            raise CommandError('No in-stock products; run generate_catalog first.')
+        paths = [
+            ('/', ''),
+            ('/products/', ''),
+            ('/products/', urlencode({'q': 'camaro', 'sort': 'price_asc'})),
+            (product.get_absolute_url(), ''),
+            ('/search/', urlencode({'q': 'hot wheels'})),
+            ('/cases/', ''),
+        ]
+        workload = list(itertools.islice(itertools.cycle(paths), options['requests']))
+        modes = ['wsgi', 'asgi'] if options['mode'] == 'both' else [options['mode']]
+
+        results = {}
+        # SLOW_QUERY_MS: under load every request is "slow"; keep the log quiet
+        with override_settings(PAGE_CACHE_ENABLED=False, DEBUG=False, SLOW_QUERY_MS=10 ** 9):
+            try:
+                for mode in modes:
+                    use_async_views(mode == 'asgi')
+                    run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+                    results[mode] = run(workload, options['concurrency'])
+            finally:
+                use_async_views(settings.ASYNC_CATALOG_VIEWS)
+        self.report(results, options['concurrency'])
+
+    def run_wsgi(self, workload, concurrency):
+        app = get_wsgi_application()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda req: wsgi_get(app, *req), workload[:concurrency]))  # warm up
+            start = time.perf_counter()
+            samples = list(pool.map(lambda req: wsgi_get(app, *req), workload))
+            elapsed = time.perf_counter() - start
+        return self.summarize(samples, elapsed)
+
+    def run_asgi(self, workload, concurrency):
+        app = get_asgi_application()
+
+        async def drive(requests):
+            queue = list(reversed(requests))
+            samples = []
+
+            async def client():
+                while queue:
+                    samples.append(await asgi_get(app, *queue.pop()))
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+            return samples
+
+        asyncio.run(drive(workload[:concurrency]))  # warm up
+        start = time.perf_counter()
+        samples = asyncio.run(drive(workload))
+        elapsed = time.perf_counter() - start
+        return self.summarize(samples, elapsed)
+
+    def summarize(self, samples, elapsed):
+        failed = [status for status, _ in samples if status >= 400]
+        if failed:
+            raise CommandError(f'{len(failed)} request(s) failed, e.g. HTTP {failed[0]}')
+        latencies = [ms for _, ms in samples]
+        return {
+            'requests': len(samples),
+            'rps': len(samples) / elapsed,
+            'p50_ms': benchmarking.percentile(latencies, 50),
+            'p95_ms': benchmarking.percentile(latencies, 95),
+        }
+
+    def report(self, results, concurrency):
+        self.stdout.write(f'concurrency={concurrency}')
+        self.stdout.write(f"{'mode':<6}  {'requests':>8}  {'req/s':>8}  {'p50 ms':>9}  {'p95 ms':>9}")
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:<6}  {r['requests']:>8}  {r['rps']:>8.1f}  {r['p50_ms']:>9.2f}  {r['p95_ms']:>9.2f}"
+            )
+        if len(results) == 2:
+            ratio = results['asgi']['rps'] / results['wsgi']['rps']
+            self.stdout.write(f'asgi/wsgi throughput: {ratio:.2f}x')
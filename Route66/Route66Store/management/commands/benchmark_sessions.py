@@ -0,0 +1,90 @@
+"""
+Per-request session overhead: database sessions vs the cached engine, and
+session vs cookie message storage.
+
+    python manage.py benchmark_sessions
+    python manage.py benchmark_sessions --iterations 200
+
+A signed-in shopper clicks through the same loop under each setup: toggle a
+wishlist entry (which flashes a message), view the cart (which shows and
+consumes it), view their orders. For every request the command counts the
+queries against ``django_session`` and the total queries, on every
+database, plus the latency. All writes happen in transactions that are
+rolled back at the end. The page cache is off.
+"""
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from Route66Store import benchmarking
+from Route66Store.models import Product
+
+SETUPS = [
+    ('db sessions, session messages',
+     'django.contrib.sessions.backends.db', 'django.contrib.messages.storage.session.SessionStorage'),
+    ('db sessions, cookie messages',
+     'django.contrib.sessions.backends.db', 'django.contrib.messages.storage.cookie.CookieStorage'),
+    ('cached sessions, cookie messages',
+     'Route66Store.session_store', 'django.contrib.messages.storage.cookie.CookieStorage'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure session queries and latency per request for each session/message storage setup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Rounds of the three-request loop.')
+        parser.add_argument('--warmup', type=int, default=2)
+
+    def handle(self, *args, **options):
+        product = Product.objects.filter(stock__gt=0).order_by('id').first()
+        if product is None:
+            raise CommandError('No in-stock products; load the demo data or run generate_catalog first.')
+
+        self.stdout.write(f"{'setup':<34} {'session q/req':>13} {'queries/req':>11} {'p50 ms':>8} {'p95 ms':>8}")
+        with override_settings(PAGE_CACHE_ENABLED=False, DEBUG=False):
+            with benchmarking.rolled_back():
+                user = User.objects.create_user('session-bench', password='unused')
+                for label, engine, storage in SETUPS:
+                    with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=storage):
+                        self.run_setup(label, user, product, options)
+
+    def run_setup(self, label, user, product, options):
+        caches['sessions'].clear()
+        client = Client()  # its handler reads SESSION_ENGINE when it loads the middleware
+        client.force_login(user)
+        loop = [
+            lambda: client.post(f'/wishlist/toggle/{product.id}/'),
+            lambda: client.get('/cart/'),
+            lambda: client.get('/orders/'),
+        ]
+        for _ in range(options['warmup']):
+            for request in loop:
+                request()
+
+        latencies, session_queries, queries = [], 0, 0
+        for _ in range(options['iterations']):
+            for request in loop:
+                with ExitStack() as stack:
+                    captured = [stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()]
+                    start = time.perf_counter()
+                    response = request()
+                    elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code >= 400:
+                    raise CommandError(f'{label}: HTTP {response.status_code}')
+                sql = [q['sql'] for context in captured for q in context.captured_queries]
+                session_queries += sum('"django_session"' in s for s in sql)
+                queries += len(sql)
+                latencies.append(elapsed)
+
+        requests = len(latencies)
+        self.stdout.write(
+            f'{label:<34} {session_queries / requests:>13.2f} {queries / requests:>11.2f} '
+            f'{benchmarking.percentile(latencies, 50):>8.2f} {benchmarking.percentile(latencies, 95):>8.2f}'
+        )
@@ -0,0 +1,134 @@
+"""
+Write throughput of the SQLite profiles (Route66Store.sqlite) under
+concurrent add-to-cart traffic.
+
+    python manage.py benchmark_sqlite_writes
+    python manage.py benchmark_sqlite_writes --threads 32 --ops 5000
+
+For each profile a fresh scratch database holding just the cart tables is
+created in a temp directory (the real databases are not touched), then
+``--threads`` threads each act like a request worker: open a transaction,
+get-or-create a shopper's cart and cart line, bump the quantity, commit, and
+at the end of the "request" close the connection unless the profile keeps
+connections open. That read-then-write shape is the add_to_cart view's.
+Operations that fail with "database is locked" are counted, not retried, the
+way the view would return a 500.
+"""
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.test.utils import override_settings
+
+from Route66Store import sqlite
+from Route66Store.models import Cart, CartItem
+
+
+def configure_alias(alias, path, profile):
+    performance = profile == 'performance'
+    options = {'transaction_mode': 'IMMEDIATE'} if performance and django.VERSION >= (5, 1) else {}
+    connections.settings[alias] = connections.configure_settings({
+        DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+        alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(path),
+            'CONN_MAX_AGE': 600 if performance else 0,
+            'OPTIONS': options,
+        },
+    })[alias]
+
+
+def drop_alias(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent cart-write throughput under the default and performance SQLite profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--ops', type=int, default=2000, help='Cart writes per profile, across all threads.')
+        parser.add_argument('--shoppers', type=int, default=200, help='Distinct carts the writes spread over.')
+        parser.add_argument('--profile', action='append', choices=sorted(sqlite.PROFILES),
+                            help='Profile(s) to run (default: all).')
+
+    def handle(self, *args, **options):
+        profiles = options['profile'] or ['default', 'performance']
+        self.stdout.write(f"{options['threads']} threads, {options['ops']} cart writes per profile\n")
+        self.stdout.write(f"{'profile':<12} {'ops/s':>8} {'ok':>6} {'locked':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile in profiles:
+                alias = f'bench_{profile}'
+                configure_alias(alias, Path(tmp) / f'{profile}.sqlite3', profile)
+                try:
+                    with override_settings(SQLITE_PROFILE=profile):
+                        self.run_profile(profile, alias, options)
+                finally:
+                    drop_alias(alias)
+
+    def run_profile(self, profile, alias, options):
+        with connections[alias].schema_editor() as editor:
+            editor.create_model(Cart)
+            editor.create_model(CartItem)
+        connections[alias].close()
+
+        remaining = iter(range(options['ops']))
+        lock = threading.Lock()
+        timings, locked = [], [0]
+        barrier = threading.Barrier(options['threads'])
+
+        def worker(seed):
+            rng = random.Random(seed)
+            connection = connections[alias]
+            barrier.wait()
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    start = time.perf_counter()
+                    try:
+                        self.add_to_cart(alias, rng.randrange(options['shoppers']), rng.randrange(1, 50))
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        with lock:
+                            locked[0] += 1
+                    else:
+                        with lock:
+                            timings.append((time.perf_counter() - start) * 1000)
+                    # end of the "request": what request_finished does
+                    connection.close_if_unusable_or_obsolete()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        p50 = statistics.median(timings) if timings else 0
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else p50
+        self.stdout.write(
+            f'{profile:<12} {len(timings) / elapsed:>8.0f} {len(timings):>6} {locked[0]:>7} {p50:>8.1f} {p95:>8.1f}'
+        )
+
+    @staticmethod
+    def add_to_cart(alias, shopper, product_id):
+        with transaction.atomic(using=alias):
+            cart, _ = Cart.objects.using(alias).get_or_create(user_id=shopper)
+            item, created = CartItem.objects.using(alias).get_or_create(cart=cart, product_id=product_id, case=None)
+            if not created:
+                item.quantity += 1
+                item.save(using=alias, update_fields=['quantity'])
@@ -0,0 +1,182 @@
+"""
+View-level benchmark with latency and query-count budgets.
+
+    python manage.py generate_catalog --products 100000
+    python manage.py benchmark_views --save-baseline      # record a baseline
+    python manage.py benchmark_views                      # compare; exits 1 on regression
+
+Every scenario is driven through the Django test client against the current
+database, except place_order[...], which calls orders.place_order directly
+with carts of PLACE_ORDER_LINES sizes; those must all use the same number of
+queries or the run fails, baseline or not. All writes (bench user, cart lines, orders) happen inside
+transactions that are rolled back at the end.
+"""
+import base64
+import itertools
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.test import Client
+from django.test.utils import override_settings
+
+from Route66Store import benchmarking, cart_summary, orders
+from Route66Store.models import Brand, Cart, CartItem, Category, Order, Product, Wishlist
+
+DEFAULT_BASELINE = settings.BASE_DIR / 'benchmarks' / 'views_baseline.json'
+
+PRODUCT_LIST_FILTERS = {
+    'all': {},
+    'q': {'q': 'camaro'},
+    'category': {'category': None},
+    'brand': {'brand': None},
+    'scale': {'scale': '1:64'},
+    'treasure_hunt': {'is_treasure_hunt': 'on'},
+    'price': {'min_price': '300', 'max_price': '2000'},
+}
+PRODUCT_LIST_SORTS = ['-created_at', 'price_asc', 'price_desc', 'name', 'popular']
+
+# A well-formed cursor holding non-string keys; must fall back to page 1, not fail
+FORGED_CURSOR = base64.urlsafe_b64encode(b'{"k":[[1],1],"d":"next"}').decode().rstrip('=')
+
+# Cart sizes for the place_order scenarios
+PLACE_ORDER_LINES = (1, 5, 20)
+
+CHECKOUT_FORM = {
+    'first_name': 'Bench', 'last_name': 'Mark', 'email': 'bench@example.com', 'phone': '0000000000',
+    'shipping_address': '1 Route 66', 'city': 'Radiator Springs', 'state': 'AZ', 'zip_code': '86000',
+    'country': 'USA', 'notes': '',
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark store views (p50/p95 latency and SQL query counts) against a stored baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed p95 latency growth over baseline, as a fraction (default 0.25).')
+        parser.add_argument('--query-threshold', type=int, default=0,
+                            help='Allowed extra queries per request over baseline (default 0).')
+        parser.add_argument('--only', action='append', default=[], help='Run only scenarios starting with this name.')
+        parser.add_argument('--with-page-cache', action='store_true',
+                            help='Leave the anonymous page cache on (measures cache hits instead of views).')
+
+    def handle(self, *args, **options):
+        if not Product.objects.filter(stock__gt=0).exists():
+            raise CommandError('No in-stock products; run generate_catalog first.')
+
+        results = {}
+        with override_settings(PAGE_CACHE_ENABLED=options['with_page_cache'], DEBUG=False):
+            with benchmarking.rolled_back():
+                self.run_scenarios(options, results)
+
+        self.report(results)
+        uneven = self.check_fixed_query_counts(results)
+        if uneven:
+            self.stderr.write(self.style.ERROR(uneven))
+            raise CommandError('place_order query count depends on the cart size.')
+        baseline = benchmarking.load_baseline(options['baseline'])
+        if options['save_baseline']:
+            benchmarking.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+        if baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}; run with --save-baseline to create one.")
+            return
+        regressions = benchmarking.compare(results, baseline, options['threshold'], options['query_threshold'])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(self.style.ERROR(line))
+            raise CommandError(f'{len(regressions)} regression(s) against baseline.')
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
+
+    # ── scenarios ────────────────────────────────────────────────────────────
+
+    def scenarios(self, user, anonymous, member):
+        product = Product.objects.filter(stock__gt=0).order_by('-review_count', 'id').first()
+        category = Category.objects.filter(products__stock__gt=0).first()
+        brand = Brand.objects.filter(product__stock__gt=0).first()
+        cart_products = list(Product.objects.filter(stock__gt=0).values_list('id', flat=True)[:5])
+        order_products = list(Product.objects.filter(stock__gt=0).values_list('id', flat=True)[:max(PLACE_ORDER_LINES)])
+        cart, _ = Cart.objects.get_or_create(user=user)
+
+        def fill_cart(product_ids=cart_products, quantity=2):
+            CartItem.objects.filter(cart=cart).delete()
+            CartItem.objects.bulk_create([CartItem(cart=cart, product_id=pid, quantity=quantity) for pid in product_ids])
+            cart_summary.invalidate(user)
+
+        def fill_order_cart(size):
+            # place_order sells one of each; put it back so the runs never go out of stock
+            Product.objects.filter(id__in=order_products[:size]).update(stock=F('stock') + 1)
+            fill_cart(order_products[:size], 1)
+
+        yield 'home', lambda: anonymous.get('/'), None
+        for (fname, params), sort in itertools.product(PRODUCT_LIST_FILTERS.items(), PRODUCT_LIST_SORTS):
+            params = dict(params, sort=sort)
+            if 'category' in params:
+                params['category'] = category.slug if category else ''
+            if 'brand' in params:
+                params['brand'] = brand.id if brand else ''
+            yield f'product_list[{fname},{sort}]', (lambda p=params: anonymous.get('/products/', p)), None
+        yield 'product_list[forged cursor]', lambda: anonymous.get('/products/', {'cursor': FORGED_CURSOR}), None
+        yield 'product_detail', lambda: anonymous.get(product.get_absolute_url()), None
+        yield 'search', lambda: anonymous.get('/search/', {'q': 'hot wheels'}), None
+        yield 'search_suggest', lambda: anonymous.get('/search/suggest/', {'q': 'ferr'}), None
+        yield 'api_product_list', lambda: anonymous.get('/api/products/', {'sort': 'price_asc'}), None
+        yield 'api_product_list[forged cursor]', lambda: anonymous.get('/api/products/', {'cursor': FORGED_CURSOR}), None
+        yield 'api_product_detail', lambda: anonymous.get(f'/api/products/{product.slug}/'), None
+        yield 'cart_view', lambda: member.get('/cart/'), fill_cart
+        yield 'checkout[get]', lambda: member.get('/checkout/'), fill_cart
+        yield 'checkout[post]', lambda: member.post('/checkout/', CHECKOUT_FORM), fill_cart
+        for size in PLACE_ORDER_LINES:
+            yield (
+                f'place_order[{size} lines]', lambda: orders.place_order(user, cart, '1 Route 66'),
+                partial(fill_order_cart, size),
+            )
+        yield 'order_list', lambda: member.get('/orders/'), None
+        yield 'wishlist_view', lambda: member.get('/wishlist/'), None
+
+    def prepare_member(self):
+        user, _ = User.objects.get_or_create(username='benchmark-user', defaults={'email': 'bench@example.com'})
+        products = list(Product.objects.filter(stock__gt=0).values_list('id', 'price')[:30])
+        wishlist, _ = Wishlist.objects.get_or_create(user=user)
+        wishlist.products.add(*[pid for pid, _ in products])
+        Order.objects.bulk_create([
+            Order(user=user, total_price=price, shipping_address='1 Route 66') for _, price in products
+        ])
+        return user
+
+    def run_scenarios(self, options, results):
+        user = self.prepare_member()
+        anonymous, member = Client(), Client()
+        member.force_login(user)
+        only = options['only']
+        for name, request, setup in self.scenarios(user, anonymous, member):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            latencies, queries, response = benchmarking.measure(
+                request, options['iterations'], options['warmup'], setup
+            )
+            status = getattr(response, 'status_code', 200)
+            if status >= 400:
+                raise CommandError(f'{name} returned HTTP {status}')
+            results[name] = benchmarking.summarize(latencies, queries)
+
+    def check_fixed_query_counts(self, results):
+        """An error line when the place_order scenarios don't all use the same number of queries."""
+        counts = {name: r['queries'] for name, r in results.items() if name.startswith('place_order[')}
+        if len(set(counts.values())) > 1:
+            return 'place_order queries by cart size: ' + ', '.join(f'{name} {n}' for name, n in counts.items())
+        return ''
+
+    def report(self, results):
+        width = max((len(n) for n in results), default=10)
+        self.stdout.write(f"{'scenario':<{width}}  {'p50 ms':>9}  {'p95 ms':>9}  {'queries':>7}")
+        for name, r in results.items():
+            self.stdout.write(f"{name:<{width}}  {r['p50_ms']:>9.2f}  {r['p95_ms']:>9.2f}  {r['queries']:>7}")
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Route66Store import images
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG derivatives for every catalog image.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: IMAGE_DERIVATIVE_WORKERS or CPU count).')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist.')
+
+    def handle(self, *args, **options):
+        names = set()
+        for label, fields in images.IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for field in fields:
+                names.update(
+                    model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                    .values_list(field, flat=True).distinct().iterator()
+                )
+        if not options['force']:
+            names = {n for n in names if not images.has_derivatives(n)}
+        if not names:
+            self.stdout.write('All derivatives are up to date.')
+            return
+
+        workers = options['workers'] or getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', None)
+        media_root = str(settings.MEDIA_ROOT)
+        start = time.monotonic()
+        written = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(images.render_safely, media_root, name, images.widths(), options['force'])
+                for name in sorted(names)
+            ]
+            for future in as_completed(futures):
+                written += future.result()
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} derivatives for {len(names)} images in {elapsed:.1f}s.'
+        ))
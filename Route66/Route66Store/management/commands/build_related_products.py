@@ -0,0 +1,51 @@
+"""
+Build the precomputed "related products" lists (Route66Store.recommendations).
+
+    python manage.py build_related_products --full    # everything, e.g. nightly
+    python manage.py build_related_products           # only what changed since the last run, e.g. hourly
+    python manage.py build_related_products --product some-slug
+
+Suggested cron:
+
+    0 * * * *   python manage.py build_related_products
+    30 3 * * *  python manage.py build_related_products --full
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from Route66Store import page_cache, recommendations
+from Route66Store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Score and store related products from co-purchases, wishlists and shared attributes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every product.')
+        parser.add_argument('--product', action='append', dest='slugs', default=[],
+                            help='Only recompute the product with this slug (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['slugs']:
+            product_ids = set(Product.objects.filter(slug__in=options['slugs']).values_list('id', flat=True))
+        elif options['full']:
+            product_ids = None
+        else:
+            since = recommendations.last_built()
+            product_ids = None if since is None else recommendations.stale_product_ids(since)
+            self.stdout.write('No previous build; computing everything.' if since is None
+                              else f'Recomputing {len(product_ids):,} products changed since {since:%Y-%m-%d %H:%M}.')
+
+        def progress(done, total):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  {done:,}/{total:,}')
+
+        built = recommendations.build(product_ids, batch_size=options['batch_size'], progress=progress)
+        if built:
+            page_cache.bump_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Related products built for {built:,} products in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,155 @@
+"""
+End-to-end check of the replica/cart database routing (Route66Store.routers).
+
+Local stand-in setup with plain SQLite files:
+
+    cp db.sqlite3 /tmp/replica.sqlite3
+    export ROUTE66_REPLICA_DB=/tmp/replica.sqlite3 ROUTE66_CART_DB=/tmp/carts.sqlite3
+    python manage.py migrate --database carts
+    python manage.py check_db_routing
+
+Drives real requests through the test client and inspects which database
+every query went to:
+- anonymous catalog pages read from the replica
+- sessions, cart lines and wishlist entries are stored in the cart database
+  only
+- after a shopper posts a review, their next page view reads the catalog from
+  the primary (the pin cookie) and shows the review
+
+It creates one throwaway user and deletes it, with everything it owns, at
+the end. The replica file is only ever read.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from Route66Store import routers
+from Route66Store.models import Cart, CartItem, Category, Order, Product, Review, Wishlist
+
+ALIASES = (DEFAULT_DB_ALIAS, routers.REPLICA, routers.CARTS)
+
+
+class Capture:
+    """Capture queries on every alias at once."""
+
+    def __enter__(self):
+        self.contexts = {alias: CaptureQueriesContext(connections[alias]) for alias in ALIASES}
+        for context in self.contexts.values():
+            context.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        for context in self.contexts.values():
+            context.__exit__(*exc)
+
+    def touched(self, alias, table):
+        return any(f'"{table}"' in q['sql'] for q in self.contexts[alias].captured_queries)
+
+
+class Command(BaseCommand):
+    help = 'Verify catalog reads hit the replica and carts/sessions live in the cart database.'
+
+    def handle(self, *args, **options):
+        missing = [alias for alias in (routers.REPLICA, routers.CARTS) if alias not in settings.DATABASES]
+        if missing:
+            raise CommandError(
+                f"Database alias(es) {', '.join(missing)} not configured; "
+                'set ROUTE66_REPLICA_DB and ROUTE66_CART_DB (see this command\'s docstring).'
+            )
+        self.failures = 0
+        self.check_routes()
+        product = Product.objects.using(routers.REPLICA).filter(stock__gt=0).order_by('id').first()
+        if product is None:
+            raise CommandError('The replica has no in-stock products; copy db.sqlite3 over it first.')
+
+        user = User.objects.create_user(f'routing-check-{uuid.uuid4().hex[:8]}', password=uuid.uuid4().hex)
+        try:
+            with override_settings(PAGE_CACHE_ENABLED=False):
+                self.check_requests(user, product)
+        finally:
+            user.delete()
+        self.expect('user cleanup removed their cart rows',
+                    not Cart.objects.filter(user_id=user.pk).exists()
+                    and not Wishlist.objects.filter(user_id=user.pk).exists())
+
+        if self.failures:
+            raise CommandError(f'{self.failures} routing check(s) failed.')
+        self.stdout.write(self.style.SUCCESS('Database routing OK.'))
+
+    def expect(self, label, ok):
+        if ok:
+            self.stdout.write(f'  ok    {label}')
+        else:
+            self.failures += 1
+            self.stdout.write(self.style.ERROR(f'  FAIL  {label}'))
+
+    def check_routes(self):
+        catalog = (Product, Category, Review)
+        for model in catalog:
+            self.expect(f'{model.__name__} reads -> replica', router.db_for_read(model) == routers.REPLICA)
+        # (asking for a write target counts as a write: later reads here use the primary)
+        for model in catalog:
+            self.expect(f'{model.__name__} writes -> default', router.db_for_write(model) == DEFAULT_DB_ALIAS)
+        self.expect('reads after a write -> default', router.db_for_read(Product) == DEFAULT_DB_ALIAS)
+        for model in (Cart, CartItem, Wishlist, Wishlist.products.through, Session):
+            self.expect(f'{model.__name__} -> carts',
+                        router.db_for_read(model) == router.db_for_write(model) == routers.CARTS)
+        for model in (Order, User):
+            self.expect(f'{model.__name__} -> default', router.db_for_read(model) == DEFAULT_DB_ALIAS)
+        self.expect('replica is never migrated', not router.allow_migrate_model(routers.REPLICA, Product))
+        self.expect('cart database only gets cart tables',
+                    router.allow_migrate_model(routers.CARTS, CartItem)
+                    and not router.allow_migrate_model(routers.CARTS, Product))
+
+    def check_requests(self, user, product):
+        anonymous, member = Client(), Client()
+        url = product.get_absolute_url()
+
+        with Capture() as capture:
+            response = anonymous.get(url)
+        self.expect('anonymous product page renders', response.status_code == 200)
+        self.expect('anonymous product page reads the replica', capture.touched(routers.REPLICA, 'store_product'))
+        self.expect('anonymous product page leaves the primary alone',
+                    not capture.touched(DEFAULT_DB_ALIAS, 'store_product'))
+
+        member.force_login(user)
+        session_key = member.session.session_key
+        self.expect('session stored in carts',
+                    Session.objects.using(routers.CARTS).filter(session_key=session_key).exists())
+        self.expect('session not stored in default',
+                    not Session.objects.using(DEFAULT_DB_ALIAS).filter(session_key=session_key).exists())
+
+        member.post(f'/cart/add/product/{product.id}/')
+        lines = CartItem.objects.filter(cart__user_id=user.pk, product_id=product.id)
+        self.expect('cart line stored in carts', lines.using(routers.CARTS).exists())
+        self.expect('cart line not stored in default', not lines.using(DEFAULT_DB_ALIAS).exists())
+        response = member.get('/cart/')
+        self.expect('cart page renders across databases',
+                    response.status_code == 200 and product.name.encode() in response.content)
+
+        member.post(f'/wishlist/toggle/{product.id}/')
+        wishlist = Wishlist.objects.get(user=user)
+        self.expect('wishlist entry stored in carts', wishlist.has_product(product.id))
+        response = member.get('/wishlist/')
+        self.expect('wishlist page renders across databases',
+                    response.status_code == 200 and product.name.encode() in response.content)
+
+        marker = f'routing check {uuid.uuid4().hex}'
+        response = member.post(url, {'rating': 5, 'title': marker, 'body': marker})
+        self.expect('review post redirects', response.status_code == 302)
+        self.expect('review post sets the pin cookie', routers.PIN_COOKIE in response.cookies)
+        with Capture() as capture:
+            response = member.get(url)
+        self.expect('pinned client reads the catalog from the primary',
+                    capture.touched(DEFAULT_DB_ALIAS, 'store_product')
+                    and not capture.touched(routers.REPLICA, 'store_product'))
+        self.expect('pinned client sees their own review', marker.encode() in response.content)
+        with Capture() as capture:
+            anonymous.get(url)
+        self.expect('other clients keep reading the replica', capture.touched(routers.REPLICA, 'store_product'))
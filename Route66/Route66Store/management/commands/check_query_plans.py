@@ -0,0 +1,108 @@
+"""
+Fail when a store view's queries fall back to full table scans.
+
+    python manage.py generate_catalog --products 100000
+    python manage.py check_query_plans            # exits 1 on a full scan
+    python manage.py check_query_plans --verbosity 2   # print every plan
+
+Runs the same scenarios as benchmark_views (inside a rolled-back
+transaction), captures every SELECT each view issues and runs
+``EXPLAIN QUERY PLAN`` on it. A ``SCAN <table>`` step without an index is a
+full table scan and counts as a failure, except on the small lookup tables in
+SMALL_TABLES, or when the query has a LIMIT and needs no sort: SQLite then
+walks the table in rowid order and stops after LIMIT rows. SQLite only.
+"""
+import re
+from contextlib import ExitStack
+
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from Route66Store import benchmarking
+from Route66Store.models import Product
+
+from .benchmark_views import Command as BenchmarkCommand
+
+# Tables that stay small no matter how big the catalog gets; scanning them is fine
+SMALL_TABLES = {'store_category', 'store_brand', 'django_session', 'auth_user', 'django_content_type'}
+
+_FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS (\w+))?$')
+_LIMIT_RE = re.compile(r'\bLIMIT\s+\d+', re.IGNORECASE)
+
+
+def explain(sql, using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(sql, plan):
+    """Tables (or aliases) the plan reads end to end without any index."""
+    if _LIMIT_RE.search(sql) and not any(step.startswith('USE TEMP B-TREE') for step in plan):
+        return []
+    scans = []
+    for step in plan:
+        match = _FULL_SCAN_RE.match(step.strip())
+        if match and match.group(1) not in SMALL_TABLES:
+            scans.append(match.group(1))
+    return scans
+
+
+class Command(BenchmarkCommand):
+    help = 'EXPLAIN every query the store views run and fail on full table scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', default=[], help='Run only scenarios starting with this name.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans reads SQLite query plans; run it against SQLite.')
+        if not Product.objects.filter(stock__gt=0).exists():
+            raise CommandError('No in-stock products; run generate_catalog first.')
+
+        failures = []
+        with override_settings(PAGE_CACHE_ENABLED=False, DEBUG=False):
+            with benchmarking.rolled_back():
+                self.check_scenarios(options, failures)
+
+        if failures:
+            for name, sql, scans in failures:
+                self.stderr.write(self.style.ERROR(f"{name}: full scan of {', '.join(scans)}"))
+                self.stderr.write(f'    {sql[:500]}')
+            raise CommandError(f'{len(failures)} quer{"y" if len(failures) == 1 else "ies"} with full table scans.')
+        self.stdout.write(self.style.SUCCESS('No full table scans.'))
+
+    def check_scenarios(self, options, failures):
+        user = self.prepare_member()
+        anonymous, member = Client(), Client()
+        member.force_login(user)
+        only = options['only']
+        seen = set()
+        for name, request, setup in self.scenarios(user, anonymous, member):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            if setup:
+                setup()
+            with ExitStack() as stack:
+                captured = [
+                    (conn, stack.enter_context(CaptureQueriesContext(conn))) for conn in connections.all()
+                ]
+                response = request()
+            status = getattr(response, 'status_code', 200)
+            if status >= 400:
+                raise CommandError(f'{name} returned HTTP {status}')
+            queries = [(conn, query['sql']) for conn, context in captured for query in context]
+            for conn, sql in queries:
+                if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                    continue
+                seen.add(sql)
+                plan = explain(sql, conn)
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f'{name}: {sql[:200]}')
+                    for step in plan:
+                        self.stdout.write(f'    {step}')
+                scans = full_scans(sql, plan)
+                if scans:
+                    failures.append((name, sql, scans))
@@ -0,0 +1,88 @@
+r"""
+Stream order lines to a file or stdout as CSV or JSON Lines
+(Route66Store.exports), in constant memory.
+
+    python manage.py export_orders --since 2026-09-01 --until 2026-09-30 > september.csv
+    python manage.py export_orders --format jsonl --status delivered --output delivered.jsonl
+    python manage.py export_orders --after-id 41872 --output new.csv
+    python manage.py export_orders --state-file /var/lib/route66/orders.last --output /exports/orders-$(date +%F).csv
+
+With --state-file the export starts after the order id stored in the file
+and stores its own last order id there once the file has been written
+completely, so a failed run is simply repeated by the next one.
+
+Suggested cron:
+
+    30 1 * * *  python manage.py export_orders --state-file /var/lib/route66/orders.last --output /exports/orders-$(date +\%F).csv
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Route66Store import exports
+from Route66Store.models import Order
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'not a YYYY-MM-DD date: {value!r}')
+
+
+def _write_atomically(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.export-')
+    with os.fdopen(fd, 'w') as handle:
+        handle.write(text)
+    os.replace(tmp, path)
+
+
+class Command(BaseCommand):
+    help = 'Export order lines as CSV or JSONL, optionally only orders added since the last export.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--since', type=_date, help='First order date to include (YYYY-MM-DD).')
+        parser.add_argument('--until', type=_date, help='Last order date to include (YYYY-MM-DD).')
+        parser.add_argument('--status', action='append', dest='statuses', default=[],
+                            choices=[value for value, _ in Order.STATUS_CHOICES], help='Repeatable.')
+        parser.add_argument('--after-id', type=int, help='Only orders with a higher id.')
+        parser.add_argument('--state-file', help='Read --after-id from this file and store the new last order id in it.')
+        parser.add_argument('--output', help='Write here instead of stdout.')
+
+    def handle(self, *args, **options):
+        after_id = options['after_id']
+        state_file = options['state_file']
+        if state_file and after_id is None and os.path.exists(state_file):
+            with open(state_file) as handle:
+                text = handle.read().strip()
+            if not text.isdigit():
+                raise CommandError(f'{state_file} should hold an order id, found {text!r}')
+            after_id = int(text)
+
+        if options['since'] and options['until'] and options['since'] > options['until']:
+            raise CommandError('--since must not be after --until.')
+        fmt = options['format']
+        export = exports.OrderExport(
+            since=options['since'], until=options['until'], statuses=options['statuses'], after_id=after_id,
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(export.stream(fmt))
+        else:
+            sys.stdout.writelines(export.stream(fmt))
+            sys.stdout.flush()
+
+        if export.last_order_id is None:
+            self.stderr.write(f'No orders to export after order {export.after_id}.')
+            return
+        if state_file:
+            _write_atomically(state_file, f'{export.last_order_id}\n')
+        self.stderr.write(
+            f'Exported {export.line_count:,} order lines (orders {export.after_id + 1}..{export.last_order_id}).'
+        )
@@ -0,0 +1,379 @@
+"""
+Generate a large, deterministic synthetic dataset for scale testing.
+
+    python manage.py generate_catalog --products 1000000 --cases 10000 --users 50000
+
+Everything is inserted with bulk_create in batches; no network access is
+needed (placeholder images are drawn locally with Pillow). The same --seed
+always produces the same rows.
+"""
+import os
+import random
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.utils.text import slugify
+
+from Route66Store import page_cache, search
+from Route66Store.models import (
+    Brand, Cart, CartItem, Category, HotWheelsCase, Order, OrderItem, Product, Review, Wishlist,
+)
+
+PREFIX = 'gen'
+# What later stages need to know about each generated product
+GeneratedProduct = namedtuple('GeneratedProduct', 'pk price name slug')
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+BRANDS = ['Hot Wheels', 'CCA', 'Bburago', 'Maisto', 'Matchbox', 'Majorette', 'Tomica', 'Greenlight', 'Mini GT', 'Kyosho']
+MAKES = {
+    'Ford': ['Mustang GT500', 'GT40', 'Bronco', 'F-150 Raptor', 'Sierra Cosworth', 'Escort RS'],
+    'Chevrolet': ['Camaro Z28', 'Corvette C8', 'Chevelle SS', 'Bel Air', 'Impala', 'Nova'],
+    'Dodge': ['Charger R/T', 'Challenger Hellcat', 'Viper GTS', 'Demon'],
+    'Nissan': ['Skyline GT-R R34', 'Silvia S15', '240Z', 'GT-R Nismo'],
+    'Toyota': ['Supra', 'AE86 Trueno', '2000GT', 'Land Cruiser'],
+    'Porsche': ['911 GT3 RS', '917K', '356 Speedster', 'Carrera GT'],
+    'Ferrari': ['250 GTO', 'F40', 'Testarossa', 'LaFerrari', 'Enzo'],
+    'Lamborghini': ['Countach', 'Huracan STO', 'Miura', 'Aventador SVJ'],
+    'McLaren': ['P1', 'Senna', 'F1', '720S'],
+    'BMW': ['M3 Competition', 'M1', '2002 Turbo', 'E30 M3'],
+    'Volkswagen': ['Beetle', 'Golf GTI', 'T1 Bus'],
+    'Aston Martin': ['DB5', 'Vantage', 'Valkyrie'],
+}
+COLORS = ['Red', 'Blue', 'Black', 'White', 'Silver', 'Yellow', 'Green', 'Orange', 'Purple', 'Gunmetal']
+SERIES = ['Mainline', 'Premium', 'Car Culture', 'Boulevard', 'Fast & Furious', 'Team Transport',
+          'Signature Series', 'Street Fire', 'Special Edition', 'Collector Series']
+SCALES = ['1:64', '1:64', '1:64', '1:43', '1:24', '1:18']
+PLACEHOLDER_COLORS = [
+    (183, 28, 28), (21, 101, 192), (46, 125, 50), (245, 127, 23), (74, 20, 140), (55, 71, 79),
+    (0, 131, 143), (191, 54, 12), (130, 119, 23), (173, 20, 87), (66, 66, 66), (13, 71, 161),
+]
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we assign."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic catalog, users and traffic data for scale testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--cases', type=int, default=500)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--carts', type=int, default=None, help='Users with a cart (default: 30%% of users).')
+        parser.add_argument('--orders', type=int, default=None, help='Default: 2x users.')
+        parser.add_argument('--reviews', type=int, default=None, help='Default: products / 2.')
+        parser.add_argument('--wishlists', type=int, default=None, help='Default: 50%% of users.')
+        parser.add_argument('--seed', type=int, default=66)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--placeholders', type=int, default=12, help='Distinct placeholder images to draw.')
+        parser.add_argument('--skip-index', action='store_true', help='Do not rebuild the search index afterwards.')
+
+    def handle(self, *args, **options):
+        if Product.objects.filter(slug__startswith=f'{PREFIX}-').exists() or \
+                HotWheelsCase.objects.filter(slug__startswith=f'{PREFIX}-case-').exists():
+            raise CommandError(
+                f'This database already has generated products or cases (slugs starting "{PREFIX}-"); '
+                'generate into a fresh database instead.'
+            )
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        users = options['users']
+        counts = {
+            'carts': options['carts'] if options['carts'] is not None else int(users * 0.3),
+            'orders': options['orders'] if options['orders'] is not None else users * 2,
+            'reviews': options['reviews'] if options['reviews'] is not None else options['products'] // 2,
+            'wishlists': options['wishlists'] if options['wishlists'] is not None else users // 2,
+        }
+        self.started = time.monotonic()
+
+        images = self.stage('placeholder images', lambda: self.make_placeholders(options['placeholders']))
+        brands, categories = self.stage('brands/categories', self.make_taxonomy)
+        with manual_timestamps(Product, HotWheelsCase, Order, Review):
+            products = self.stage('products', lambda: self.make_products(options['products'], brands, categories, images))
+            self.stage('cases', lambda: self.make_cases(options['cases'], images))
+            user_ids = self.stage('users', lambda: self.make_users(users))
+            self.stage('reviews', lambda: self.make_reviews(counts['reviews'], products, user_ids))
+            self.stage('orders', lambda: self.make_orders(counts['orders'], products, user_ids))
+        self.stage('carts', lambda: self.make_carts(counts['carts'], products, user_ids))
+        self.stage('wishlists', lambda: self.make_wishlists(counts['wishlists'], products, user_ids))
+
+        self.stage('rating stats', lambda: Product.rebuild_rating_stats(
+            Product.objects.filter(slug__startswith=f'{PREFIX}-')
+        ))
+        if not options['skip_index']:
+            self.stage('search index', search.rebuild_index)
+        page_cache.bump_generation()
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(f'Done in {elapsed:.1f}s.'))
+
+    # ── helpers ──────────────────────────────────────────────────────────────
+
+    def stage(self, label, func):
+        start = time.monotonic()
+        result = func()
+        elapsed = max(time.monotonic() - start, 1e-9)
+        if isinstance(result, int):
+            rows = result
+        elif isinstance(result, tuple):
+            rows = sum(len(r) for r in result)
+        else:
+            rows = len(result)
+        self.stdout.write(f'  {label:<20} {rows:>10,} rows  {elapsed:8.2f}s  {rows / elapsed:>12,.0f} rows/s')
+        return result
+
+    def batched(self, model, objects, keep=None):
+        """
+        bulk_create objects (any iterable) in batch_size chunks. Returns
+        [keep(obj), ...] for the created rows, or just the row count when keep
+        is None, so huge runs never hold every model instance in memory.
+        """
+        kept, count, batch = [], 0, []
+
+        def flush():
+            nonlocal count
+            with transaction.atomic(using=router.db_for_write(model)):
+                created = model.objects.bulk_create(batch)
+            count += len(created)
+            if keep is not None:
+                kept.extend(keep(obj) for obj in created)
+
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+        return kept if keep is not None else count
+
+    def timestamp(self, days=730):
+        return EPOCH - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    # ── stages ───────────────────────────────────────────────────────────────
+
+    def make_placeholders(self, count):
+        from PIL import Image, ImageDraw
+
+        names = []
+        folder = os.path.join(settings.MEDIA_ROOT, 'products', 'placeholders')
+        os.makedirs(folder, exist_ok=True)
+        for i in range(count):
+            name = f'products/placeholders/placeholder-{i:02d}.jpg'
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if not os.path.exists(path):
+                color = PLACEHOLDER_COLORS[i % len(PLACEHOLDER_COLORS)]
+                image = Image.new('RGB', (800, 533), color)
+                draw = ImageDraw.Draw(image)
+                draw.rectangle((40, 40, 760, 493), outline=(255, 255, 255), width=6)
+                draw.text((70, 70), f'ROUTE66 #{i:02d}', fill=(255, 255, 255))
+                image.save(path, 'JPEG', quality=80)
+            names.append(name)
+        return names
+
+    def make_taxonomy(self):
+        brands = []
+        for name in BRANDS:
+            brand, _ = Brand.objects.get_or_create(slug=slugify(name), defaults={'name': name})
+            brands.append(brand)
+        categories = []
+        for value, label in Category.CATEGORY_CHOICES:
+            slug = slugify(label)
+            category, _ = Category.objects.get_or_create(
+                slug=slug, defaults={'name': label, 'category_type': value}
+            )
+            categories.append(category)
+        return brands, categories
+
+    def make_products(self, count, brands, categories, images):
+        rng = self.rng
+        makes = list(MAKES.items())
+
+        def rows():
+            for i in range(count):
+                make, models = makes[i % len(makes)]
+                model = rng.choice(models)
+                year = rng.randint(1955, 2025)
+                series = rng.choice(SERIES)
+                scale = rng.choice(SCALES)
+                color = rng.choice(COLORS)
+                price = Decimal(rng.choice([199, 299, 399, 599, 799, 999, 1499, 1999, 2499, 4999]))
+                created = self.timestamp()
+                is_th = rng.random() < 0.03
+                yield Product(
+                    name=f'{make} {model} {color}',
+                    slug=f'{PREFIX}-{i}',
+                    brand=brands[i % len(brands)],
+                    category=categories[rng.randrange(len(categories))],
+                    description=(
+                        f'A {scale} scale diecast {year} {make} {model} in {color}. '
+                        f'Part of the {series} series.'
+                    ),
+                    price=price,
+                    sale_price=(price * Decimal('0.9')).quantize(Decimal('1')) if rng.random() < 0.1 else None,
+                    scale=scale,
+                    car_model=f'{make} {model}',
+                    car_year=year,
+                    color=color,
+                    series=series,
+                    is_treasure_hunt=is_th,
+                    is_super_treasure_hunt=is_th and rng.random() < 0.1,
+                    is_featured=rng.random() < 0.02,
+                    is_new_arrival=rng.random() < 0.05,
+                    stock=0 if rng.random() < 0.15 else rng.randint(1, 50),
+                    image=images[i % len(images)] if images else None,
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        return self.batched(
+            Product, rows(), keep=lambda p: GeneratedProduct(p.pk, p.display_price, p.name, p.slug),
+        )
+
+    def make_cases(self, count, images):
+        rng = self.rng
+
+        def rows():
+            for i in range(count):
+                year = 2000 + i % 26
+                letter = chr(ord('A') + i % 26)
+                created = self.timestamp()
+                yield HotWheelsCase(
+                    name=f'{year} Hot Wheels {rng.choice(SERIES)} Case {letter}',
+                    slug=f'{PREFIX}-case-{i}',
+                    year=year,
+                    series_letter=letter,
+                    price=Decimal(rng.choice([2499, 3499, 4999, 5499])),
+                    cars_per_case=rng.choice([10, 48, 72]),
+                    description=f'Full {year} case {letter}.',
+                    image=images[i % len(images)] if images else None,
+                    stock=rng.randint(0, 20),
+                    is_featured=rng.random() < 0.05,
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        return self.batched(HotWheelsCase, rows())
+
+    def make_users(self, count):
+        password = make_password('route66', salt='route66generated')
+        start = User.objects.filter(username__startswith=f'{PREFIX}-user-').count()
+
+        def rows():
+            for i in range(start, start + count):
+                yield User(
+                    username=f'{PREFIX}-user-{i}',
+                    email=f'{PREFIX}-user-{i}@example.com',
+                    password=password,
+                )
+
+        return self.batched(User, rows(), keep=lambda u: u.pk)
+
+    def make_reviews(self, count, products, user_ids):
+        if not products or not user_ids:
+            return 0
+        rng = self.rng
+        # Skew towards a few "bestsellers" like real traffic does
+        hot = products[:max(1, len(products) // 100)]
+
+        def rows():
+            for _ in range(count):
+                product_id = (rng.choice(hot) if rng.random() < 0.3 else rng.choice(products)).pk
+                rating = rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 9])[0]
+                yield Review(
+                    product_id=product_id,
+                    user_id=rng.choice(user_ids),
+                    rating=rating,
+                    title=f'{rating} stars',
+                    body='Generated review.',
+                    created_at=self.timestamp(),
+                )
+
+        return self.batched(Review, rows())
+
+    def make_orders(self, count, products, user_ids):
+        if not products or not user_ids:
+            return 0
+        rng = self.rng
+        statuses = [value for value, _ in Order.STATUS_CHOICES]
+        line_sets = []
+
+        def rows():
+            for _ in range(count):
+                lines = [(rng.choice(products), rng.randint(1, 3)) for _ in range(rng.randint(1, 5))]
+                line_sets.append(lines)
+                created = self.timestamp()
+                yield Order(
+                    user_id=rng.choice(user_ids),
+                    status=rng.choice(statuses),
+                    total_price=sum(product.price * qty for product, qty in lines),
+                    shipping_address='1 Route 66, Radiator Springs',
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        order_ids = self.batched(Order, rows(), keep=lambda o: o.pk)
+
+        def items():
+            for order_id, lines in zip(order_ids, line_sets):
+                for product, qty in lines:
+                    yield OrderItem(
+                        order_id=order_id, product_id=product.pk, quantity=qty, price=product.price,
+                        item_name=product.name, item_slug=product.slug,
+                    )
+
+        return len(order_ids) + self.batched(OrderItem, items())
+
+    def make_carts(self, count, products, user_ids):
+        if not products or not user_ids:
+            return 0
+        rng = self.rng
+        owners = rng.sample(user_ids, min(count, len(user_ids)))
+        taken = set(Cart.objects.filter(user_id__in=owners).values_list('user_id', flat=True))
+        cart_ids = self.batched(Cart, (Cart(user_id=uid) for uid in owners if uid not in taken), keep=lambda c: c.pk)
+
+        def items():
+            for cart_id in cart_ids:
+                for product in rng.sample(products, min(len(products), rng.randint(1, 6))):
+                    yield CartItem(cart_id=cart_id, product_id=product.pk, quantity=rng.randint(1, 3))
+
+        return len(cart_ids) + self.batched(CartItem, items())
+
+    def make_wishlists(self, count, products, user_ids):
+        if not products or not user_ids:
+            return 0
+        rng = self.rng
+        owners = rng.sample(user_ids, min(count, len(user_ids)))
+        taken = set(Wishlist.objects.filter(user_id__in=owners).values_list('user_id', flat=True))
+        wishlist_ids = self.batched(
+            Wishlist, (Wishlist(user_id=uid) for uid in owners if uid not in taken), keep=lambda w: w.pk
+        )
+        Through = Wishlist.products.through
+
+        def links():
+            for wishlist_id in wishlist_ids:
+                for product in rng.sample(products, min(len(products), rng.randint(1, 12))):
+                    yield Through(wishlist_id=wishlist_id, product_id=product.pk)
+
+        return len(wishlist_ids) + self.batched(Through, links())
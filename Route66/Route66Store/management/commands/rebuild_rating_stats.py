@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from Route66Store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the denormalized rating_avg/review_count fields on Product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', action='append', dest='slugs', default=[],
+                            help='Only repair the product with this slug (repeatable).')
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['slugs']:
+            queryset = queryset.filter(slug__in=options['slugs'])
+        updated = Product.rebuild_rating_stats(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed rating stats for {updated} products.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from Route66Store import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for products and Hot Wheels cases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search.fts_enabled():
+            self.stdout.write('Full-text index is only used on SQLite; nothing to do.')
+            return
+        total = search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} catalog rows.'))
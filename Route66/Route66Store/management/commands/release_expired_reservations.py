@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Route66Store import reservations
+
+
+class Command(BaseCommand):
+    help = 'Give back the stock of checkout holds that have expired. Run from cron every minute or so.'
+
+    def handle(self, *args, **options):
+        released = reservations.release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired stock holds.'))
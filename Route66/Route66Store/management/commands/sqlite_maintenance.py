@@ -0,0 +1,106 @@
+"""
+Routine SQLite upkeep for the store's writable databases (default, plus the
+cart database when it is configured).
+
+    python manage.py sqlite_maintenance                 # optimize, reclaim free pages, checkpoint
+    python manage.py sqlite_maintenance --analyze       # also rebuild all planner statistics
+    python manage.py sqlite_maintenance --enable-incremental-vacuum   # one-off, see below
+
+Suggested cron:
+
+    */30 * * * *  python manage.py sqlite_maintenance
+    15 4 * * *    python manage.py sqlite_maintenance --analyze
+
+Each run:
+- ``PRAGMA optimize`` refreshes statistics SQLite thinks are stale (cheap)
+- ``--analyze`` runs a full ``ANALYZE`` instead, e.g. after a big import
+- ``PRAGMA incremental_vacuum`` hands free pages back to the filesystem;
+  this only works once the file is in ``auto_vacuum=INCREMENTAL`` mode,
+  which needs one full ``VACUUM`` to switch on (--enable-incremental-vacuum;
+  it rewrites the whole file and blocks writers while it runs)
+- ``PRAGMA wal_checkpoint(TRUNCATE)`` folds the WAL back into the database
+  and truncates it, so the -wal file doesn't keep growing between quiet
+  periods
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from Route66Store import routers
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def pragma(cursor, statement):
+    cursor.execute(f'PRAGMA {statement}')
+    return cursor.fetchone()
+
+
+def file_size(path):
+    total = 0
+    for suffix in ('', '-wal'):
+        try:
+            total += os.path.getsize(f'{path}{suffix}')
+        except OSError:
+            pass
+    return total
+
+
+class Command(BaseCommand):
+    help = 'ANALYZE/optimize, reclaim free pages and checkpoint the WAL of the SQLite databases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='Run a full ANALYZE instead of PRAGMA optimize.')
+        parser.add_argument('--vacuum-pages', type=int, default=0,
+                            help='Free pages to reclaim per run (default: all of them).')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Switch to auto_vacuum=INCREMENTAL (runs a full VACUUM once).')
+
+    def handle(self, *args, **options):
+        aliases = [
+            alias for alias in settings.DATABASES
+            if alias != routers.REPLICA and connections[alias].vendor == 'sqlite'
+        ]
+        for alias in aliases:
+            self.maintain(alias, options)
+
+    def maintain(self, alias, options):
+        connection = connections[alias]
+        path = connection.settings_dict['NAME']
+        size_before = file_size(path)
+        with connection.cursor() as cursor:
+            free_before = pragma(cursor, 'freelist_count')[0]
+            if options['enable_incremental_vacuum'] and pragma(cursor, 'auto_vacuum')[0] != AUTO_VACUUM_INCREMENTAL:
+                self.stdout.write(f'{alias}: switching to auto_vacuum=INCREMENTAL (full VACUUM)...')
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+
+            if options['analyze']:
+                cursor.execute('ANALYZE')
+            else:
+                # analysis_limit keeps optimize quick on big tables
+                cursor.execute('PRAGMA analysis_limit = 1000')
+                cursor.execute('PRAGMA optimize')
+
+            if pragma(cursor, 'auto_vacuum')[0] == AUTO_VACUUM_INCREMENTAL:
+                cursor.execute(f"PRAGMA incremental_vacuum({options['vacuum_pages']})")
+                cursor.fetchall()
+            elif free_before:
+                self.stdout.write(
+                    f'{alias}: {free_before} free pages left in place; '
+                    'run once with --enable-incremental-vacuum to reclaim them.'
+                )
+
+            if pragma(cursor, 'journal_mode')[0].lower() == 'wal':
+                busy = pragma(cursor, 'wal_checkpoint(TRUNCATE)')[0]
+                if busy:
+                    self.stdout.write(f'{alias}: WAL checkpoint blocked by an open reader; retry later.')
+            free_after = pragma(cursor, 'freelist_count')[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{alias}: {"analyzed" if options["analyze"] else "optimized"}, '
+            f'free pages {free_before} -> {free_after}, '
+            f'size {size_before / 1e6:.1f} MB -> {file_size(path) / 1e6:.1f} MB'
+        ))
@@ -0,0 +1,96 @@
+"""
+Concurrency stress test for the stock reservation engine.
+
+    python manage.py stress_checkout --buyers 200 --stock 1
+
+Creates a throwaway product with --stock units, gives each of --buyers users
+a cart holding one, then releases them all into place_order() at once. Fails
+if more orders are placed than there was stock, or stock goes negative.
+Everything the run creates is deleted afterwards.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from Route66Store.models import Cart, CartItem, Order, Product
+from Route66Store.orders import place_order
+from Route66Store.reservations import OutOfStockError
+
+PREFIX = 'stress-buyer-'
+
+
+class Command(BaseCommand):
+    help = 'Hammer one SKU with concurrent checkouts and verify it never oversells.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=100)
+        parser.add_argument('--stock', type=int, default=1)
+        parser.add_argument('--retries', type=int, default=20,
+                            help='Retries per buyer when the database reports it is locked.')
+
+    def handle(self, *args, **options):
+        buyers, stock = options['buyers'], options['stock']
+        product = Product.objects.create(
+            name='Stress Test Super Treasure Hunt', slug=f'stress-sth-{int(time.time() * 1000)}',
+            description='Stress test item', price=Decimal('999.00'), stock=stock,
+            is_treasure_hunt=True, is_super_treasure_hunt=True,
+        )
+        User.objects.filter(username__startswith=PREFIX).delete()
+        User.objects.bulk_create([User(username=f'{PREFIX}{i}') for i in range(buyers)])
+        users = list(User.objects.filter(username__startswith=PREFIX))
+        carts = Cart.objects.bulk_create([Cart(user=u) for u in users])
+        CartItem.objects.bulk_create([CartItem(cart=c, product=product, quantity=1) for c in carts])
+
+        outcomes = {'ordered': 0, 'out_of_stock': 0, 'locked': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(users))
+
+        def buy(user, cart):
+            barrier.wait()
+            try:
+                for attempt in range(options['retries'] + 1):
+                    try:
+                        place_order(user, cart, shipping_address='Stress test')
+                        result = 'ordered'
+                    except OutOfStockError:
+                        result = 'out_of_stock'
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc) or attempt == options['retries']:
+                            raise
+                        time.sleep(0.01 * (attempt + 1))
+                        continue
+                    break
+                with lock:
+                    outcomes[result] += 1
+            except OperationalError:
+                with lock:
+                    outcomes['locked'] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy, args=(u, c)) for u, c in zip(users, carts)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        product.refresh_from_db()
+        orders = Order.objects.filter(user__in=users).count()
+        self.stdout.write(
+            f"{buyers} buyers, {stock} in stock -> {outcomes['ordered']} orders, "
+            f"{outcomes['out_of_stock']} out of stock, {outcomes['locked']} gave up on locks; "
+            f"final stock {product.stock}; {elapsed:.2f}s ({buyers / elapsed:.0f} checkouts/s)"
+        )
+
+        User.objects.filter(username__startswith=PREFIX).delete()
+        product.delete()
+
+        if orders > stock or product.stock < 0 or orders + product.stock != stock:
+            raise CommandError(f'Oversold: {orders} orders for {stock} units, final stock {product.stock}.')
+        self.stdout.write(self.style.SUCCESS('No oversell.'))
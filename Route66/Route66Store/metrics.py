@@ -0,0 +1,101 @@
+"""
+In-process request metrics, rendered in the Prometheus text format.
+
+The registry lives in this module and is updated by
+``middleware.RequestMetricsMiddleware``. Each worker process keeps its own
+numbers; scrape every process (or sum them) the way you would for any
+multi-process Prometheus client.
+"""
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.query_seconds = defaultdict(float)
+        self.response_bytes = defaultdict(int)
+        self.responses = defaultdict(int)
+
+    def record(self, view, status, seconds, query_count, query_seconds, size):
+        with _lock:
+            self.latency[view].observe(seconds)
+            self.queries[view].observe(query_count)
+            self.query_seconds[view] += query_seconds
+            if size is not None:
+                self.response_bytes[view] += size
+            self.responses[(view, str(status))] += 1
+
+
+registry = Registry()
+
+
+def _labels(**labels):
+    inner = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f'{{{inner}}}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name, help_text, histograms):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for view, hist in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(view=view, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(view=view, le="+Inf")} {hist.count}')
+        lines.append(f'{name}_sum{_labels(view=view)} {hist.sum}')
+        lines.append(f'{name}_count{_labels(view=view)} {hist.count}')
+    return lines
+
+
+def render(extra_counters=None):
+    """Return the registry as Prometheus exposition text."""
+    with _lock:
+        lines = _histogram_lines(
+            'route66_request_duration_seconds', 'Request latency by URL name.', registry.latency,
+        )
+        lines += _histogram_lines(
+            'route66_request_db_queries', 'SQL queries per request by URL name.', registry.queries,
+        )
+        lines += ['# HELP route66_db_query_seconds_total Time spent in SQL by URL name.',
+                  '# TYPE route66_db_query_seconds_total counter']
+        lines += [f'route66_db_query_seconds_total{_labels(view=v)} {s}'
+                  for v, s in sorted(registry.query_seconds.items())]
+        lines += ['# HELP route66_response_bytes_total Response body bytes by URL name.',
+                  '# TYPE route66_response_bytes_total counter']
+        lines += [f'route66_response_bytes_total{_labels(view=v)} {n}'
+                  for v, n in sorted(registry.response_bytes.items())]
+        lines += ['# HELP route66_responses_total Responses by URL name and status code.',
+                  '# TYPE route66_responses_total counter']
+        lines += [f'route66_responses_total{_labels(view=v, status=s)} {n}'
+                  for (v, s), n in sorted(registry.responses.items())]
+    for name, (help_text, value) in sorted((extra_counters or {}).items()):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
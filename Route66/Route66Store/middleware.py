@@ -0,0 +1,173 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+
+logger = logging.getLogger('Route66Store.metrics')
+
+# The recorder of the request being handled, for ORM work it hands to other threads
+_current_recorder = contextvars.ContextVar('route66_query_recorder', default=None)
+
+
+class _QueryRecorder:
+    """connection.execute_wrapper that counts and times queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = (0.0, '')
+        # async views run queries from several worker threads at once
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.count += 1
+                self.seconds += elapsed
+                if elapsed > self.slowest[0]:
+                    self.slowest = (elapsed, sql)
+
+
+def _wrap_connections(stack, recorder):
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(recorder))
+
+
+def current_recorder():
+    """The query recorder of the request being handled, or None outside one."""
+    return _current_recorder.get()
+
+
+@contextmanager
+def recording_queries(recorder):
+    """Count this thread's queries into recorder (from current_recorder()) for the block."""
+    with ExitStack() as stack:
+        if recorder is not None:
+            _wrap_connections(stack, recorder)
+        yield
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, SQL query count/time, response size and status per URL
+    name (e.g. "store:product_list") into metrics.registry, and log the
+    slowest query of any request that crosses SLOW_QUERY_MS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = _QueryRecorder()
+        token = _current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                _wrap_connections(stack, recorder)
+                response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.record(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs in the request's thread-sensitive worker
+        # thread, whose connections are not the ones on the event loop thread,
+        # so the wrappers are installed (and removed) from inside that thread.
+        # Views that fan out to other threads (async_views.run) install the
+        # recorder there themselves.
+        recorder = _QueryRecorder()
+        token = _current_recorder.set(recorder)
+        stack = ExitStack()
+        start = time.perf_counter()
+        await sync_to_async(_wrap_connections)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current_recorder.reset(token)
+        return self.record(request, response, recorder, time.perf_counter() - start)
+
+    def record(self, request, response, recorder, elapsed):
+        name = view_name(request)
+        size = None if response.streaming else len(response.content)
+        metrics.registry.record(name, response.status_code, elapsed, recorder.count, recorder.seconds, size)
+
+        slow_ms = getattr(settings, 'SLOW_QUERY_MS', 100)
+        slowest_seconds, slowest_sql = recorder.slowest
+        if slowest_seconds * 1000 >= slow_ms:
+            logger.warning(
+                'Slow query in %s (%.1fms, %d queries in request): %s',
+                name, slowest_seconds * 1000, recorder.count, slowest_sql[:2000],
+            )
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes for the catalog replica (see routers.py). A request that
+    writes to the primary gets a short-lived cookie; while it is present that
+    client's catalog reads go to the primary instead of the replica.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not routers.has_replica():
+            return self.get_response(request)
+        tokens = routers.begin_request(routers.PIN_COOKIE in request.COOKIES)
+        try:
+            return self.pin(self.get_response(request))
+        finally:
+            routers.end_request(tokens)
+
+    async def __acall__(self, request):
+        if not routers.has_replica():
+            return await self.get_response(request)
+        tokens = routers.begin_request(routers.PIN_COOKIE in request.COOKIES)
+        try:
+            return self.pin(await self.get_response(request))
+        finally:
+            routers.end_request(tokens)
+
+    def pin(self, response):
+        if routers.wrote_to_primary():
+            response.set_cookie(
+                routers.PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 15),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from Route66Store import search
+    if not search.fts_enabled(schema_editor.connection):
+        return
+    Product = apps.get_model('store', 'Product')
+    HotWheelsCase = apps.get_model('store', 'HotWheelsCase')
+    sql = (
+        f"INSERT INTO {search.SEARCH_TABLE} (kind, obj_id, name, car_model, series, description) "
+        "VALUES (%s, %s, %s, %s, %s, %s)"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(search.CREATE_TABLE_SQL)
+        cursor.executemany(sql, [
+            [search.KIND_PRODUCT, p.pk, p.name, p.car_model, p.series, p.description]
+            for p in Product.objects.all()
+        ])
+        cursor.executemany(sql, [
+            [search.KIND_CASE, c.pk, c.name, '', f"{c.year} Case {c.series_letter}", c.description]
+            for c in HotWheelsCase.objects.all()
+        ])
+
+
+def drop_index(apps, schema_editor):
+    from Route66Store import search
+    if not search.fts_enabled(schema_editor.connection):
+        return
+    schema_editor.execute(search.DROP_TABLE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.functions
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('store', 'Review')
+    reviews = (
+        Review.objects.filter(product=models.OuterRef('pk')).order_by().values('product')
+    )
+    rating_field = models.DecimalField(max_digits=3, decimal_places=2)
+    Product.objects.update(
+        rating_avg=models.functions.Coalesce(
+            models.functions.Cast(models.Subquery(reviews.annotate(v=models.Avg('rating')).values('v')), rating_field),
+            models.Value(0), output_field=rating_field,
+        ),
+        review_count=models.functions.Coalesce(
+            models.Subquery(reviews.annotate(v=models.Count('id')).values('v'), output_field=models.IntegerField()),
+            models.Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at'], name='review_product_recent_idx'),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
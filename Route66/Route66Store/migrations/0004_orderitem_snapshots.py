@@ -0,0 +1,48 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+def backfill_snapshots(apps, schema_editor):
+    OrderItem = apps.get_model('store', 'OrderItem')
+    batch = []
+    items = OrderItem.objects.select_related('product', 'case').filter(item_name='')
+    for item in items.iterator(chunk_size=2000):
+        source = item.product or item.case
+        if source is None:
+            continue
+        item.item_name = source.name
+        item.item_slug = source.slug
+        item.item_image = source.image.name if source.image else ''
+        batch.append(item)
+        if len(batch) >= 2000:
+            OrderItem.objects.bulk_update(batch, ['item_name', 'item_slug', 'item_image'])
+            batch = []
+    if batch:
+        OrderItem.objects.bulk_update(batch, ['item_name', 'item_slug', 'item_image'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_product_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='item_image',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='item_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='item_slug',
+            field=models.SlugField(blank=True, max_length=200),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
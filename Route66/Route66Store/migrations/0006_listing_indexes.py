@@ -0,0 +1,69 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def analyze_tables(apps, schema_editor):
+    # Without statistics SQLite's planner can't tell the new partial indexes
+    # apart and often picks a filtering index plus a sort over an ordered scan.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for model in ('Product', 'HotWheelsCase', 'Order'):
+        schema_editor.execute(f"ANALYZE {apps.get_model('store', model)._meta.db_table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_stock_reservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotwheelscase',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['-created_at'], name='case_instock_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['-created_at'], name='product_instock_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['price'], name='product_instock_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['name'], name='product_instock_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['category', '-created_at'], name='product_instock_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['brand', '-created_at'], name='product_instock_brand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['scale', '-created_at'], name='product_instock_scale_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_featured', True), ('stock__gt', 0)), fields=['-created_at'], name='product_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_new_arrival', True), ('stock__gt', 0)), fields=['-created_at'], name='product_new_arrival_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_treasure_hunt', True), ('stock__gt', 0)), fields=['-created_at'], name='product_treasure_hunt_idx'),
+        ),
+        migrations.RunPython(analyze_tables, migrations.RunPython.noop),
+    ]
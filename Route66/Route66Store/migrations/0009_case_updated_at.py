@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # AddField stamps every existing case with the migration time; creation
+    # time is the closest honest value for a Last-Modified header.
+    HotWheelsCase = apps.get_model('store', 'HotWheelsCase')
+    HotWheelsCase.objects.using(schema_editor.connection.alias).update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_related_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotwheelscase',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
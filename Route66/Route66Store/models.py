@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models import Avg, Count, DecimalField, F, Q, Sum, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Now
 from django.contrib.auth.models import User
 from django.urls import reverse
 
+from . import routers
+
 
 class Category(models.Model):
     CATEGORY_CHOICES = [
@@ -21,6 +25,7 @@ class Category(models.Model):
     category_type = models.CharField(max_length=30, choices=CATEGORY_CHOICES, default='diecast_164')
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = 'Categories'
@@ -38,6 +43,7 @@ class Brand(models.Model):
     slug = models.SlugField(unique=True)
     logo = models.ImageField(upload_to='brands/', blank=True, null=True)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -72,15 +78,70 @@ class Product(models.Model):
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     image2 = models.ImageField(upload_to='products/', blank=True, null=True)
     image3 = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Denormalized from Review; kept current by signals (see refresh_rating_stats)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    review_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        # Every storefront listing filters on stock > 0 and pages by
+        # (sort key, id), so the listing indexes are partial on in-stock rows
+        # and end in the sort key; SQLite appends the rowid (id) itself.
+        # Checked against real query plans by `manage.py check_query_plans`.
+        indexes = [
+            models.Index(fields=['-created_at'], condition=Q(stock__gt=0), name='product_instock_new_idx'),
+            models.Index(fields=['price'], condition=Q(stock__gt=0), name='product_instock_price_idx'),
+            models.Index(fields=['name'], condition=Q(stock__gt=0), name='product_instock_name_idx'),
+            models.Index(fields=['category', '-created_at'], condition=Q(stock__gt=0),
+                         name='product_instock_cat_idx'),
+            models.Index(fields=['brand', '-created_at'], condition=Q(stock__gt=0),
+                         name='product_instock_brand_idx'),
+            models.Index(fields=['scale', '-created_at'], condition=Q(stock__gt=0),
+                         name='product_instock_scale_idx'),
+            # Home page shelves and the treasure hunt filter pick a handful
+            # of flagged rows out of the whole catalog
+            models.Index(fields=['-created_at'], condition=Q(stock__gt=0, is_featured=True),
+                         name='product_featured_idx'),
+            models.Index(fields=['-created_at'], condition=Q(stock__gt=0, is_new_arrival=True),
+                         name='product_new_arrival_idx'),
+            models.Index(fields=['-created_at'], condition=Q(stock__gt=0, is_treasure_hunt=True),
+                         name='product_treasure_hunt_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def refresh_rating_stats(cls, product_id):
+        """Recompute rating_avg/review_count for one product from its reviews."""
+        stats = Review.objects.filter(product_id=product_id).aggregate(avg=Avg('rating'), count=Count('id'))
+        # updated_at too: the page shows the reviews (see conditional.py)
+        cls.objects.filter(pk=product_id).update(
+            rating_avg=round(stats['avg'] or 0, 2),
+            review_count=stats['count'],
+            updated_at=Now(),
+        )
+
+    @classmethod
+    def rebuild_rating_stats(cls, queryset=None):
+        """
+        Recompute the rating aggregates for every product in queryset (default:
+        all products) with a single UPDATE. Returns the number of rows updated.
+        """
+        reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        avg = reviews.annotate(v=Avg('rating')).values('v')
+        count = reviews.annotate(v=Count('id')).values('v')
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(
+            rating_avg=Coalesce(
+                Cast(Subquery(avg), DecimalField(max_digits=3, decimal_places=2)),
+                Value(0), output_field=DecimalField(max_digits=3, decimal_places=2),
+            ),
+            review_count=Coalesce(Subquery(count, output_field=IntegerField()), Value(0)),
+        )
+
     def get_absolute_url(self):
         return reverse('store:product_detail', kwargs={'slug': self.slug})
 
@@ -112,6 +173,12 @@ class HotWheelsCase(models.Model):
     stock = models.IntegerField(default=0)
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], condition=Q(stock__gt=0), name='case_instock_new_idx'),
+        ]
 
     def __str__(self):
         return f"{self.year} Hot Wheels Case {self.series_letter} - {self.name}"
@@ -137,13 +204,22 @@ class Order(models.Model):
     tracking_number = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_recent_idx'),
+        ]
+
     def __str__(self):
-        return f"Order #{self.id} by {self.user.username}"
+        # Only name the user when it is already loaded, so listing orders
+        # doesn't cost one user query per row.
+        if Order.user.is_cached(self):
+            return f"Order #{self.id} by {self.user.username}"
+        return f"Order #{self.id}"
 
     def calculate_total(self):
-        total = sum(item.subtotal for item in self.items.all())
-        self.total_price = total
-        self.save()
+        total = self.items.aggregate(total=Sum(F('price') * F('quantity')))['total']
+        self.total_price = total or 0
+        self.save(update_fields=['total_price', 'updated_at'])
 
 
 class OrderItem(models.Model):
@@ -152,18 +228,47 @@ class OrderItem(models.Model):
     case = models.ForeignKey(HotWheelsCase, on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.IntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Snapshot of the product/case at purchase time, so order history renders
+    # without joining the live catalog (and survives catalog edits/deletes).
+    item_name = models.CharField(max_length=200, blank=True)
+    item_slug = models.SlugField(max_length=200, blank=True)
+    item_image = models.CharField(max_length=255, blank=True)
 
     @property
     def subtotal(self):
         return self.price * self.quantity
 
     def __str__(self):
-        item = self.product or self.case
-        return f"{self.quantity}x {item} in Order #{self.order.id}"
+        return f"{self.quantity}x {self.item_name} in Order #{self.order_id}"
 
+    def save(self, *args, **kwargs):
+        # Lines added outside place_order (e.g. the admin inline) snapshot themselves
+        if not (self.item_name and self.item_slug):
+            self.take_snapshot()
+        super().save(*args, **kwargs)
+
+    def take_snapshot(self):
+        item = self.product or self.case
+        if item is not None:
+            self.item_name = item.name
+            self.item_slug = item.slug
+            self.item_image = item.image.name if item.image else ''
 
+    @property
+    def item_url(self):
+        if not self.item_slug:
+            return ''
+        if self.product_id:
+            return reverse('store:product_detail', kwargs={'slug': self.item_slug})
+        if self.case_id:
+            return reverse('store:case_detail', kwargs={'slug': self.item_slug})
+        return ''
+
+
+# Carts and wishlists may live in their own database (Route66Store.routers),
+# so their links to users and the catalog carry no database constraint.
 class Cart(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart', db_constraint=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -180,8 +285,8 @@ class Cart(models.Model):
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE)
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True)
-    case = models.ForeignKey(HotWheelsCase, on_delete=models.CASCADE, null=True, blank=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, db_constraint=False)
+    case = models.ForeignKey(HotWheelsCase, on_delete=models.CASCADE, null=True, blank=True, db_constraint=False)
     quantity = models.IntegerField(default=1)
 
     @property
@@ -195,6 +300,13 @@ class CartItem(models.Model):
         item = self.product or self.case
         return item.display_price if hasattr(item, 'display_price') else item.price
 
+    @property
+    def line_id(self):
+        """Names the line in cart URLs; guest lines (unsaved, see cart_store) use 'p<id>'/'c<id>'."""
+        if self.pk:
+            return str(self.pk)
+        return f'p{self.product_id}' if self.product_id else f'c{self.case_id}'
+
 
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews', null=True, blank=True)
@@ -204,13 +316,69 @@ class Review(models.Model):
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='review_product_recent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.rating}★ by {self.user.username} on {self.product}"
 
 
 class Wishlist(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wishlist')
-    products = models.ManyToManyField(Product, blank=True)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wishlist', db_constraint=False)
+    products = models.ManyToManyField(Product, blank=True, db_constraint=False)
 
     def __str__(self):
         return f"Wishlist of {self.user.username}"
+
+    # Read membership from the link table rather than through self.products,
+    # which joins the product table and so needs both in one database.
+    def product_ids(self):
+        """Product ids on this wishlist, as a subquery when the catalog shares its database."""
+        ids = Wishlist.products.through.objects.filter(wishlist=self).values_list('product_id', flat=True)
+        return ids if ids.db == routers.catalog_db() else list(ids)
+
+    def has_product(self, product_id):
+        return Wishlist.products.through.objects.filter(wishlist=self, product_id=product_id).exists()
+
+
+class RelatedProduct(models.Model):
+    """
+    Precomputed "you may also like" list: product's related products in rank
+    order. Built offline by the build_related_products command
+    (Route66Store.recommendations).
+    """
+    # indexed through the (product, rank) constraint below
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_entries', db_index=False)
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_by')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} for product {self.product_id}: {self.related_id} ({self.score:.2f})"
+
+
+class StockReservation(models.Model):
+    """
+    A time-limited hold on stock taken when a customer starts checkout. The
+    held quantity has already been subtracted from Product/HotWheelsCase.stock;
+    it is either consumed by the order or given back when the hold expires.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True)
+    case = models.ForeignKey(HotWheelsCase, on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        kind, item_id = ('product', self.product_id) if self.product_id else ('case', self.case_id)
+        return f"Hold of {self.quantity}x {kind} #{item_id} until {self.expires_at:%Y-%m-%d %H:%M}"
+
@@ -0,0 +1,61 @@
+"""
+Order placement.
+
+``place_order`` turns a cart into an order inside one transaction using a
+fixed number of queries regardless of how many lines the cart holds:
+one SELECT for the lines (with products/cases joined, or prefetched when
+carts live in their own database), a handful of
+statements to turn the stock hold into a sale (see reservations.consume),
+one INSERT for the order, one bulk INSERT for its items and one DELETE to
+empty the cart. benchmark_views pins this: its place_order[1/5/20 lines]
+scenarios fail the run when their query counts differ.
+"""
+from django.db import transaction
+
+from . import page_cache, reservations, routers
+from .models import CartItem, Order, OrderItem
+
+
+class EmptyCartError(Exception):
+    pass
+
+
+def cart_lines(cart):
+    """All lines in cart with their product/case loaded up front."""
+    return list(routers.with_catalog(cart.cartitem_set.all(), 'product', 'case'))
+
+
+def lines_total(lines):
+    return sum((line.subtotal for line in lines), 0)
+
+
+@transaction.atomic
+def place_order(user, cart, shipping_address, notes=''):
+    lines = cart_lines(cart)
+    if not lines:
+        raise EmptyCartError('Cart is empty.')
+    reservations.consume(user, lines)
+
+    order_items = [
+        OrderItem(
+            product=line.product,
+            case=line.case,
+            quantity=line.quantity,
+            price=line.unit_price,
+        )
+        for line in lines
+    ]
+    order = Order.objects.create(
+        user=user,
+        shipping_address=shipping_address,
+        notes=notes,
+        total_price=sum((item.subtotal for item in order_items), 0),
+    )
+    for item in order_items:
+        item.order = order
+        item.take_snapshot()
+    OrderItem.objects.bulk_create(order_items)
+    CartItem.objects.filter(cart=cart).delete()
+    # Stock levels are shown on catalog pages
+    transaction.on_commit(page_cache.bump_generation)
+    return order
@@ -0,0 +1,151 @@
+"""
+Full-page cache for anonymous catalog browsing.
+
+Cached pages are keyed on the path, the normalized query string and the
+current catalog generation. Saving or deleting any catalog model bumps the
+generation (see ``signals.py``), which orphans every cached page at once;
+orphans simply age out of the cache.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .pagination import wants_json
+
+GENERATION_KEY = 'catalog:generation'
+HITS_KEY = 'pagecache:hits'
+MISSES_KEY = 'pagecache:misses'
+
+
+def _timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 5 * 60)
+
+
+def _enabled():
+    return getattr(settings, 'PAGE_CACHE_ENABLED', True)
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        value = 1
+        cache.add(GENERATION_KEY, value, None)
+    return value
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    return {'hits': hits, 'misses': misses, 'generation': generation()}
+
+
+def normalize_query(querydict):
+    """Sorted, blank-free query string so ?a=1&b= and ?a=1 share an entry."""
+    pairs = sorted(
+        (key, value)
+        for key, values in querydict.lists()
+        for value in values
+        if value != ''
+    )
+    return '&'.join(f'{k}={v}' for k, v in pairs)
+
+
+def cache_key(request):
+    raw = f"{request.path}?{normalize_query(request.GET)}|json={int(wants_json(request))}"
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'page:{generation()}:{digest}'
+
+
+def is_shared_request(request):
+    """True when request would be rendered the same page as any anonymous visitor."""
+    if request.user.is_authenticated:
+        return False
+    # The cart badge shows a guest cart's contents
+    if getattr(settings, 'GUEST_CART_COOKIE', 'r66_cart') in request.COOKIES:
+        return False
+    # Pending flash messages are rendered into the page, so don't serve or
+    # store a shared copy for this request.
+    return len(messages.get_messages(request)) == 0
+
+
+def _cacheable_request(request):
+    if not _enabled() or request.method not in ('GET', 'HEAD'):
+        return False
+    return is_shared_request(request)
+
+
+def _cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header('Cache-Control')
+    )
+
+
+def _cached_response(key):
+    cached = cache.get(key)
+    if cached is None:
+        _count(MISSES_KEY)
+        return None
+    _count(HITS_KEY)
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'HIT'
+    return response
+
+
+def _store(key, response):
+    if hasattr(response, 'render') and callable(response.render):
+        response = response.render()
+    if _cacheable_response(response):
+        cache.set(key, (response.content, response['Content-Type']), _timeout())
+    response['X-Page-Cache'] = 'MISS'
+    return response
+
+
+def anonymous_page_cache(view):
+    """Serve anonymous GETs of view (sync or async) from the page cache."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            # request.user and the message store may hit the database
+            key = await sync_to_async(lambda: cache_key(request) if _cacheable_request(request) else None)()
+            if key is None:
+                return await view(request, *args, **kwargs)
+            response = await sync_to_async(_cached_response)(key)
+            if response is None:
+                response = await sync_to_async(_store)(key, await view(request, *args, **kwargs))
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable_request(request):
+            return view(request, *args, **kwargs)
+        key = cache_key(request)
+        response = _cached_response(key)
+        if response is None:
+            response = _store(key, view(request, *args, **kwargs))
+        return response
+    return wrapper
@@ -0,0 +1,174 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of the last row shown rather than by an
+OFFSET, so fetching page 500 costs the same as page 1. Every ordering gets
+``id`` as a tiebreaker, which keeps the order stable when sort values repeat.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 24
+MAX_PER_PAGE = 100
+
+CURSOR_PARAM = 'cursor'
+
+
+def encode_cursor(values, direction='next'):
+    payload = json.dumps({'k': [str(v) for v in values], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (values, direction), or (None, 'next') for a missing or broken cursor."""
+    if not cursor:
+        return None, 'next'
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values, direction = payload['k'], payload.get('d', 'next')
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError):
+        return None, 'next'
+    # encode_cursor only ever writes strings
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values) or direction not in ('next', 'prev'):
+        return None, 'next'
+    return values, direction
+
+
+class KeysetPage:
+    def __init__(self, object_list, per_page, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.next_url = None
+        self.prev_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def build_urls(self, request):
+        self.next_url = _url_with_cursor(request, self.next_cursor)
+        self.prev_url = _url_with_cursor(request, self.prev_cursor)
+        return self
+
+    def as_json(self, items):
+        return {
+            'results': items,
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+        }
+
+
+def _url_with_cursor(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params[CURSOR_PARAM] = cursor
+    return f"?{params.urlencode()}"
+
+
+def _sort_keys(ordering):
+    """'-price' -> [('price', True), ('id', True)]"""
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    if field in ('id', 'pk'):
+        return [('id', descending)]
+    return [(field, descending), ('id', descending)]
+
+
+def _after_filter(keys, values):
+    """
+    Build the "row comes after values" condition for a composite key, e.g.
+    (price > p) OR (price = p AND id > i).
+    """
+    condition = Q()
+    for i, (field, descending) in enumerate(keys):
+        step = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[i]})
+        for j in range(i):
+            step &= Q(**{keys[j][0]: values[j]})
+        condition |= step
+    return condition
+
+
+def _key_values(obj, keys):
+    # model instances, or dicts from .values()
+    if isinstance(obj, dict):
+        return [obj[field] for field, _ in keys]
+    return [getattr(obj, field) for field, _ in keys]
+
+
+def paginate(queryset, ordering, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Return a KeysetPage of queryset ordered by ``ordering`` (a single field,
+    optionally prefixed with '-') starting after ``cursor``.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    keys = _sort_keys(ordering)
+    values, direction = decode_cursor(cursor)
+
+    model = queryset.model
+    if values is not None:
+        try:
+            if len(values) != len(keys):
+                raise ValidationError('cursor length mismatch')
+            values = [model._meta.get_field(f).to_python(v) for (f, _), v in zip(keys, values)]
+        except (ValidationError, TypeError, ValueError):
+            values, direction = None, 'next'
+
+    scan_keys = keys if direction == 'next' else [(f, not desc) for f, desc in keys]
+    qs = queryset.order_by(*[f"{'-' if desc else ''}{f}" for f, desc in scan_keys])
+    if values is not None:
+        qs = qs.filter(_after_filter(scan_keys, values))
+
+    rows = list(qs[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if (direction == 'next' and has_more) or (direction == 'prev' and values is not None):
+            next_cursor = encode_cursor(_key_values(rows[-1], keys), 'next')
+        if (direction == 'prev' and has_more) or (direction == 'next' and values is not None):
+            prev_cursor = encode_cursor(_key_values(rows[0], keys), 'prev')
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor)
+
+
+def paginate_request(request, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+    """paginate() driven by the ``cursor`` and ``per_page`` query parameters."""
+    try:
+        per_page = int(request.GET.get('per_page', per_page))
+    except ValueError:
+        pass
+    page = paginate(queryset, ordering, request.GET.get(CURSOR_PARAM), per_page)
+    return page.build_urls(request)
+
+
+def wants_json(request):
+    return (
+        request.GET.get('format') == 'json'
+        or 'application/json' in request.headers.get('Accept', '')
+    )
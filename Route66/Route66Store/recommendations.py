@@ -0,0 +1,221 @@
+"""
+"Related products", computed offline.
+
+build() scores candidate pairs from three signals and keeps each product's
+best RELATED_PRODUCTS_STORED in the RelatedProduct table:
+
+- co-purchase: orders that contain both products
+- co-wishlist: wishlists that hold both
+- attribute overlap: same car model, series, brand, category or scale, and
+  car years at most two apart
+
+Co-occurrence counts form a sparse product x product matrix, kept as
+{product_id: Counter} rows and filled basket by basket, so the work follows
+the pairs that actually occur. Attribute candidates come from blocking:
+products are grouped on each attribute and compared only with their
+ATTRIBUTE_NEIGHBOURS nearest ids on either side within each group, which
+keeps the job linear in catalog size instead of quadratic.
+
+related_products() reads a product's list back with one query on the
+(product, rank) index, falling back to same-category products for products
+added since the last build.
+
+Incremental runs (build(stale_product_ids(last_built()))) only recompute
+products saved or ordered since the last build, plus products that have no
+list yet. Wishlist changes and new attribute neighbours are picked up by the
+next full build.
+"""
+import bisect
+import itertools
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import OrderItem, Product, RelatedProduct, Wishlist
+
+CO_PURCHASE_WEIGHT = 3.0
+CO_WISHLIST_WEIGHT = 2.0
+ATTRIBUTE_WEIGHTS = {
+    'car_model': 1.5, 'series': 1.0, 'brand': 0.75, 'category': 0.5, 'scale': 0.5,
+}
+NEAR_YEAR_WEIGHT = 0.5
+NEAR_YEARS = 2
+
+# Groups used to find attribute candidates, most specific first
+BLOCKS = (('car_model',), ('series', 'scale'), ('brand', 'scale'), ('category', 'scale'))
+ATTRIBUTE_NEIGHBOURS = 8
+# Orders/wishlists with more lines than this say little about any one pair
+MAX_BASKET = 50
+
+_FIELDS = ('id', 'car_model', 'series', 'brand', 'category', 'scale', 'car_year')
+
+
+def _stored():
+    return getattr(settings, 'RELATED_PRODUCTS_STORED', 12)
+
+
+def last_built():
+    return RelatedProduct.objects.aggregate(at=Max('computed_at'))['at']
+
+
+def stale_product_ids(since):
+    """Products to recompute in an incremental run."""
+    ordered = OrderItem.objects.filter(order__created_at__gt=since, product__isnull=False)
+    ids = set(Product.objects.filter(updated_at__gt=since).values_list('id', flat=True))
+    ids.update(ordered.values_list('product_id', flat=True))
+    ids.update(
+        Product.objects.filter(~Exists(RelatedProduct.objects.filter(product=OuterRef('pk'))))
+        .values_list('id', flat=True)
+    )
+    return ids
+
+
+class Catalog:
+    """Product attributes plus the blocking index over them, loaded once per build."""
+
+    def __init__(self):
+        self.attributes = {}
+        self.groups = defaultdict(list)
+        rows = Product.objects.order_by('id').values_list(
+            'id', 'car_model', 'series', 'brand_id', 'category_id', 'scale', 'car_year'
+        )
+        for row in rows.iterator(chunk_size=5000):
+            attrs = dict(zip(_FIELDS, row))
+            attrs['car_model'] = attrs['car_model'].strip().lower()
+            attrs['series'] = attrs['series'].strip().lower()
+            self.attributes[row[0]] = attrs
+            for block in BLOCKS:
+                key = self._block_key(block, attrs)
+                if key is not None:
+                    # ids arrive sorted, so every group list stays sorted
+                    self.groups[key].append(row[0])
+
+    @staticmethod
+    def _block_key(block, attrs):
+        values = tuple(attrs[field] for field in block)
+        if any(value in (None, '') for value in values):
+            return None
+        return (block, values)
+
+    def neighbours(self, product_id):
+        attrs = self.attributes[product_id]
+        found = set()
+        for block in BLOCKS:
+            key = self._block_key(block, attrs)
+            if key is None:
+                continue
+            members = self.groups[key]
+            at = bisect.bisect_left(members, product_id)
+            found.update(members[max(0, at - ATTRIBUTE_NEIGHBOURS):at + ATTRIBUTE_NEIGHBOURS + 1])
+        found.discard(product_id)
+        return found
+
+    def similarity(self, a, b):
+        first, second = self.attributes[a], self.attributes[b]
+        score = sum(
+            weight for field, weight in ATTRIBUTE_WEIGHTS.items()
+            if first[field] not in (None, '') and first[field] == second[field]
+        )
+        if first['car_year'] and second['car_year'] and abs(first['car_year'] - second['car_year']) <= NEAR_YEARS:
+            score += NEAR_YEAR_WEIGHT
+        return score
+
+
+def co_occurrence(pairs, targets):
+    """
+    Sparse co-occurrence rows for the products in targets, from
+    (basket_id, product_id) pairs ordered by basket.
+    """
+    rows = defaultdict(Counter)
+    for _, group in itertools.groupby(pairs, key=lambda pair: pair[0]):
+        basket = {product_id for _, product_id in group}
+        if len(basket) < 2 or len(basket) > MAX_BASKET:
+            continue
+        for product_id in basket & targets:
+            row = rows[product_id]
+            for other in basket:
+                if other != product_id:
+                    row[other] += 1
+    return rows
+
+
+def _purchases(targets):
+    orders = OrderItem.objects.filter(product_id__in=targets).values('order_id')
+    return (
+        OrderItem.objects.filter(order_id__in=orders, product__isnull=False)
+        .order_by('order_id').values_list('order_id', 'product_id')
+    )
+
+
+def _wishlists(targets):
+    links = Wishlist.products.through.objects
+    wishlists = links.filter(product_id__in=targets).values('wishlist_id')
+    return links.filter(wishlist_id__in=wishlists).order_by('wishlist_id').values_list('wishlist_id', 'product_id')
+
+
+def rank(catalog, product_id, purchases, wishlists, limit):
+    """[(score, related_id)] best first."""
+    bought, saved = purchases.get(product_id, {}), wishlists.get(product_id, {})
+    candidates = catalog.neighbours(product_id).union(bought, saved)
+    candidates &= catalog.attributes.keys()
+    scored = [
+        (
+            CO_PURCHASE_WEIGHT * math.log1p(bought.get(other, 0))
+            + CO_WISHLIST_WEIGHT * math.log1p(saved.get(other, 0))
+            + catalog.similarity(product_id, other),
+            other,
+        )
+        for other in candidates
+    ]
+    # ties go to the newer product
+    scored.sort(reverse=True)
+    return [(score, other) for score, other in scored[:limit] if score > 0]
+
+
+def build(product_ids=None, batch_size=2000, progress=None):
+    """
+    Recompute the related lists of product_ids (default: every product).
+    Returns the number of products processed.
+    """
+    if product_ids is not None and not product_ids:
+        return 0
+    catalog = Catalog()
+    targets = sorted(catalog.attributes if product_ids is None else set(product_ids) & catalog.attributes.keys())
+    limit = _stored()
+    using = router.db_for_write(RelatedProduct)
+    for start in range(0, len(targets), batch_size):
+        chunk = targets[start:start + batch_size]
+        chunk_set = set(chunk)
+        purchases = co_occurrence(_purchases(chunk).iterator(chunk_size=5000), chunk_set)
+        wishlists = co_occurrence(_wishlists(chunk).iterator(chunk_size=5000), chunk_set)
+        now = timezone.now()
+        rows = [
+            RelatedProduct(product_id=product_id, related_id=other, rank=position, score=score, computed_at=now)
+            for product_id in chunk
+            for position, (score, other) in enumerate(rank(catalog, product_id, purchases, wishlists, limit))
+        ]
+        with transaction.atomic(using=using):
+            RelatedProduct.objects.filter(product_id__in=chunk).delete()
+            RelatedProduct.objects.bulk_create(rows, batch_size=5000)
+        if progress:
+            progress(start + len(chunk), len(targets))
+    return len(targets)
+
+
+def related_products(product, limit=4):
+    """In-stock related products for product's page, best first."""
+    # brand is shown on every product card
+    related = list(
+        Product.objects.filter(recommended_by__product=product, stock__gt=0)
+        .select_related('brand').order_by('recommended_by__rank')[:limit]
+    )
+    if related:
+        return related
+    return list(
+        Product.objects.filter(category_id=product.category_id, stock__gt=0).exclude(id=product.id)
+        .select_related('brand')[:limit]
+    )
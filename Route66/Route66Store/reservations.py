@@ -0,0 +1,191 @@
+"""
+Inventory reservations.
+
+Stock is taken with conditional UPDATEs (``... SET stock = stock - n WHERE
+stock >= n``), one statement per model for a whole cart, so two buyers can
+never both get the last unit: the database applies the decrements one at a
+time and the loser's row no longer matches. Starting checkout places a
+time-limited hold (``StockReservation``) on the cart's stock; placing the
+order consumes it, and holds that expire are given back by
+``release_expired()``.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .models import HotWheelsCase, Product, StockReservation
+
+
+class OutOfStockError(Exception):
+    def __init__(self, items):
+        self.items = items
+        self.names = ', '.join(str(item) for item in items)
+        super().__init__(f'Not enough stock for: {self.names}')
+
+
+def hold_timeout():
+    return timedelta(seconds=getattr(settings, 'STOCK_HOLD_SECONDS', 10 * 60))
+
+
+def _quantities(lines):
+    """Cart lines -> (Counter{product_id: qty}, Counter{case_id: qty})."""
+    products, cases = Counter(), Counter()
+    for line in lines:
+        if line.product_id:
+            products[line.product_id] += line.quantity
+        elif line.case_id:
+            cases[line.case_id] += line.quantity
+    return products, cases
+
+
+def _per_row(quantities):
+    """CASE id WHEN 1 THEN 3 WHEN 2 THEN 1 END"""
+    return Case(
+        *[When(id=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+class _Short(Exception):
+    pass
+
+
+def _take(model, quantities):
+    """
+    Subtract quantities from stock in one conditional UPDATE. Returns the
+    rows that could not be satisfied (empty when every row was updated).
+    """
+    if not quantities:
+        return []
+    amount = _per_row(quantities)
+    try:
+        # Savepoint so a short batch can be undone and the short rows reported.
+        with transaction.atomic():
+            updated = model.objects.filter(id__in=quantities.keys(), stock__gte=amount).update(
+                stock=F('stock') - amount, updated_at=Now()
+            )
+            if updated != len(quantities):
+                raise _Short
+    except _Short:
+        rows = model.objects.in_bulk(quantities.keys())
+        # A row deleted since it was carted is as unsellable as one that is short
+        return [row for pk, row in rows.items() if row.stock < quantities[pk]] + [
+            f'{model._meta.verbose_name} #{pk}' for pk in quantities.keys() - rows.keys()
+        ]
+    return []
+
+
+def _give_back(model, quantities):
+    if quantities:
+        amount = _per_row(quantities)
+        model.objects.filter(id__in=quantities.keys()).update(stock=F('stock') + amount, updated_at=Now())
+
+
+def _release(holds):
+    """Return the stock of holds (a list of StockReservation) and delete them."""
+    if not holds:
+        return 0
+    products, cases = _quantities(holds)
+    _give_back(Product, products)
+    _give_back(HotWheelsCase, cases)
+    StockReservation.objects.filter(id__in=[h.id for h in holds]).delete()
+    return len(holds)
+
+
+def take_stock(lines):
+    """
+    Decrement stock for lines (CartItems or holds) or raise OutOfStockError.
+    Must run inside a transaction so a partial failure is rolled back.
+    """
+    products, cases = _quantities(lines)
+    short = _take(Product, products) + _take(HotWheelsCase, cases)
+    if short:
+        raise OutOfStockError(short)
+
+
+def release_user_holds(user):
+    # Plain read first: most cart edits have no hold, and the write
+    # transaction below takes SQLite's write lock.
+    if not StockReservation.objects.filter(user=user).exists():
+        return 0
+    with transaction.atomic():
+        return _release(list(StockReservation.objects.select_for_update().filter(user=user)))
+
+
+@transaction.atomic
+def release_expired(now=None, batch_size=1000):
+    """Give back every expired hold. Returns the number released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        holds = list(
+            StockReservation.objects.select_for_update()
+            .filter(expires_at__lte=now).order_by('id')[:batch_size]
+        )
+        if not holds:
+            return released
+        released += _release(holds)
+
+
+def _release_expired_for(products, cases):
+    """Give back expired holds on just these SKUs so they can be sold now."""
+    now = timezone.now()
+    expired = StockReservation.objects.select_for_update().filter(expires_at__lte=now)
+    holds = []
+    if products:
+        holds += list(expired.filter(product_id__in=products.keys()))
+    if cases:
+        holds += list(expired.filter(case_id__in=cases.keys()))
+    _release(holds)
+
+
+def release_expired_on(stock_item):
+    """
+    Give back expired holds on one Product or HotWheelsCase, so an abandoned
+    checkout does not keep it out of a cart until release_expired() runs.
+    Returns True if stock came back (stock_item is then refreshed).
+    """
+    if isinstance(stock_item, Product):
+        field, products, cases = 'product', {stock_item.id: 0}, {}
+    else:
+        field, products, cases = 'case', {}, {stock_item.id: 0}
+    if not StockReservation.objects.filter(**{field: stock_item}, expires_at__lte=timezone.now()).exists():
+        return False
+    with transaction.atomic():
+        _release_expired_for(products, cases)
+    stock_item.refresh_from_db(fields=['stock', 'updated_at'])
+    return True
+
+
+@transaction.atomic
+def hold_cart(user, lines):
+    """
+    Reserve stock for the cart lines for STOCK_HOLD_SECONDS, replacing any
+    hold the user already has. Returns the expiry time.
+    """
+    _release(list(StockReservation.objects.select_for_update().filter(user=user)))
+    products, cases = _quantities(lines)
+    _release_expired_for(products, cases)
+    take_stock(lines)
+    expires_at = timezone.now() + hold_timeout()
+    StockReservation.objects.bulk_create(
+        [StockReservation(user=user, product_id=pk, quantity=q, expires_at=expires_at) for pk, q in products.items()]
+        + [StockReservation(user=user, case_id=pk, quantity=q, expires_at=expires_at) for pk, q in cases.items()]
+    )
+    return expires_at
+
+
+def consume(user, lines):
+    """
+    Turn the user's holds into a sale of lines. Called from place_order inside
+    its transaction: the holds are given back and the lines taken again with
+    the same conditional UPDATE, so an expired or partial hold can never
+    oversell. Raises OutOfStockError.
+    """
+    _release(list(StockReservation.objects.select_for_update().filter(user=user)))
+    take_stock(lines)
@@ -0,0 +1,124 @@
+"""
+Database routing for the optional read replica and cart database.
+
+Two extra aliases are recognised when settings.DATABASES defines them:
+
+``replica``
+    A read-only copy of ``default``. Catalog reads (products, categories,
+    brands, cases, reviews) go there, so browsing doesn't queue behind the
+    primary's write lock. It is never migrated; replication keeps it current.
+
+``carts``
+    Carts, cart lines, wishlists and sessions: small rows written on almost
+    every shopper click. Keeping them in their own database means that churn
+    doesn't contend with catalog or order traffic. Migrate it with
+    ``manage.py migrate --database carts``.
+
+Without those aliases everything routes to ``default``, as before.
+
+Read-your-writes: once a request writes to the primary, catalog reads for the
+rest of that request, and for REPLICA_PIN_SECONDS afterwards (a cookie set by
+ReplicaPinningMiddleware), come from the primary, so a shopper sees their own
+review straight after posting it. Reads inside a transaction on the primary
+stay on the primary too.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+CARTS = 'carts'
+
+CATALOG_MODELS = {
+    'store.product', 'store.category', 'store.brand', 'store.hotwheelscase', 'store.review', 'store.relatedproduct',
+}
+CART_MODELS = {'store.cart', 'store.cartitem', 'store.wishlist', 'store.wishlist_products', 'sessions.session'}
+
+PIN_COOKIE = 'r66_primary'
+
+# The request carries the pin cookie from an earlier write
+_pinned = ContextVar('route66_pinned', default=False)
+# The current request has written to the primary
+_wrote = ContextVar('route66_wrote', default=False)
+
+
+def has_replica():
+    return REPLICA in settings.DATABASES
+
+
+def cart_db():
+    return CARTS if CARTS in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+def separate_cart_db():
+    return cart_db() != DEFAULT_DB_ALIAS
+
+
+def catalog_db():
+    """Alias catalog reads currently go to."""
+    if not has_replica() or _pinned.get() or _wrote.get():
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return REPLICA
+
+
+def begin_request(pinned):
+    """Reset the routing state for a new request. Returns tokens for end_request()."""
+    return _pinned.set(pinned), _wrote.set(False)
+
+
+def end_request(tokens):
+    _pinned.reset(tokens[0])
+    _wrote.reset(tokens[1])
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+def with_catalog(queryset, *fields):
+    """
+    Load queryset's catalog relations (e.g. a cart line's product) with a
+    join when both live in the same database, or with one extra query per
+    relation when they don't.
+    """
+    if queryset.db == catalog_db():
+        return queryset.select_related(*fields)
+    return queryset.prefetch_related(*fields)
+
+
+class StoreRouter:
+    """
+    Catalog reads -> replica, cart/session models -> carts, everything else
+    (and every catalog write) -> default. Always returns an alias, so related
+    lookups from a cart row never follow the row's own database.
+    """
+
+    def db_for_read(self, model, **hints):
+        label = model._meta.label_lower
+        if label in CART_MODELS:
+            return cart_db()
+        if label in CATALOG_MODELS:
+            return catalog_db()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower in CART_MODELS:
+            return cart_db()
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # All aliases hold parts of the same store
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA:
+            return False
+        if db == CARTS:
+            return model_name is not None and f'{app_label}.{model_name}' in CART_MODELS
+        # default keeps (empty) cart tables even when carts live elsewhere, so
+        # cascading deletes from users and products still find a table there
+        return None
@@ -0,0 +1,222 @@
+"""
+Full-text catalog search.
+
+On SQLite the catalog is mirrored into an FTS5 table (``store_search_index``)
+so searches hit an inverted index instead of running ``LIKE '%q%'`` scans.
+Rows are kept in sync by the signal handlers in ``signals.py``. Other database
+backends fall back to the old ``icontains`` filters.
+"""
+import re
+
+from django.db import connection, connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Product, HotWheelsCase
+from .pagination import DEFAULT_PER_PAGE, KeysetPage, decode_cursor, encode_cursor
+
+SEARCH_TABLE = 'store_search_index'
+
+KIND_PRODUCT = 'product'
+KIND_CASE = 'case'
+
+# bm25() weights, one per indexed column: name, car_model, series, description
+COLUMN_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "kind UNINDEXED, obj_id UNINDEXED, name, car_model, series, description, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_TABLE_SQL = f"DROP TABLE IF EXISTS {SEARCH_TABLE}"
+
+
+def fts_enabled(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def _document(obj):
+    """Return the (kind, name, car_model, series, description) row for obj."""
+    if isinstance(obj, HotWheelsCase):
+        series = f"{obj.year} Case {obj.series_letter}"
+        return KIND_CASE, obj.name, '', series, obj.description or ''
+    return KIND_PRODUCT, obj.name, obj.car_model or '', obj.series or '', obj.description or ''
+
+
+def index_object(obj):
+    if not fts_enabled():
+        return
+    kind, name, car_model, series, description = _document(obj)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE kind = %s AND obj_id = %s", [kind, obj.pk]
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (kind, obj_id, name, car_model, series, description) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            [kind, obj.pk, name, car_model, series, description],
+        )
+
+
+def unindex_object(obj):
+    if not fts_enabled():
+        return
+    kind = _document(obj)[0]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE kind = %s AND obj_id = %s", [kind, obj.pk]
+        )
+
+
+def rebuild_index(batch_size=2000, conn=None):
+    """Drop and repopulate the whole index. Returns the number of rows indexed."""
+    conn = conn or connection
+    if not fts_enabled(conn):
+        return 0
+    total = 0
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute(DROP_TABLE_SQL)
+        cursor.execute(CREATE_TABLE_SQL)
+        sql = (
+            f"INSERT INTO {SEARCH_TABLE} (kind, obj_id, name, car_model, series, description) "
+            "VALUES (%s, %s, %s, %s, %s, %s)"
+        )
+        for model in (Product, HotWheelsCase):
+            batch = []
+            for obj in model.objects.using(conn.alias).iterator(chunk_size=batch_size):
+                kind, *fields = _document(obj)
+                batch.append([kind, obj.pk, *fields])
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def build_match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match,
+    and each word is also matched as a prefix ("cam" finds "Camaro").
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def ranked_hits(query, kind=None, limit=None, after=None):
+    """
+    Return [(kind, obj_id, score, rowid), ...] for query, best match first.
+    ``after`` is a (score, rowid) pair; only hits ranked below it are returned,
+    which lets callers page through results without OFFSET.
+    """
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+    weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+    sql = (
+        f"SELECT kind, obj_id, score, rid FROM ("
+        f"SELECT kind, obj_id, bm25({SEARCH_TABLE}, 0, 0, {weights}) AS score, rowid AS rid "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+    )
+    params = [expression]
+    if kind:
+        sql += " AND kind = %s"
+        params.append(kind)
+    sql += ")"
+    if after is not None:
+        sql += " WHERE score > %s OR (score = %s AND rid > %s)"
+        params.extend([after[0], after[0], after[1]])
+    sql += " ORDER BY score, rid"
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    # read from wherever catalog reads go (the replica, if configured)
+    with connections[router.db_for_read(Product)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(row[0], int(row[1]), row[2], row[3]) for row in cursor.fetchall()]
+
+
+def ranked_ids(query, kind=None, limit=None):
+    """Return [(kind, obj_id), ...] for query, best match first."""
+    return [(k, obj_id) for k, obj_id, _, _ in ranked_hits(query, kind=kind, limit=limit)]
+
+
+def _icontains_products(query):
+    return Product.objects.filter(
+        Q(name__icontains=query) | Q(car_model__icontains=query) |
+        Q(description__icontains=query) | Q(series__icontains=query)
+    )
+
+
+def filter_products(queryset, query):
+    """Restrict a Product queryset to rows matching query."""
+    if not fts_enabled():
+        return queryset & _icontains_products(query)
+    expression = build_match_expression(query)
+    if not expression:
+        return queryset.none()
+    # A subquery rather than a list of ids: no bm25 ranking (the caller
+    # sorts) and no bound parameter per hit, however many rows match.
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT obj_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind = %s",
+        [expression, KIND_PRODUCT],
+    ))
+
+
+def _load_hits(hits):
+    """Turn [(kind, obj_id), ...] into model instances, keeping the order."""
+    product_ids = [obj_id for kind, obj_id in hits if kind == KIND_PRODUCT]
+    case_ids = [obj_id for kind, obj_id in hits if kind == KIND_CASE]
+    objects = {}
+    if product_ids:
+        for p in Product.objects.select_related('brand').filter(id__in=product_ids):
+            objects[(KIND_PRODUCT, p.id)] = p
+    if case_ids:
+        for c in HotWheelsCase.objects.filter(id__in=case_ids):
+            objects[(KIND_CASE, c.id)] = c
+    return [objects[hit] for hit in hits if hit in objects]
+
+
+def search_catalog(query, limit=200):
+    """
+    Search products and cases together. Returns one list of model
+    instances ordered by relevance.
+    """
+    if not query:
+        return []
+    if not fts_enabled():
+        products = list(_icontains_products(query).select_related('brand')[:limit])
+        cases = list(HotWheelsCase.objects.filter(name__icontains=query)[:limit])
+        return (products + cases)[:limit]
+    return _load_hits(ranked_ids(query, limit=limit))
+
+
+def search_page(query, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    One KeysetPage of combined search results. The cursor is the
+    (score, rowid) of the last hit on the previous page.
+    """
+    if not query:
+        return KeysetPage([], per_page)
+    if not fts_enabled():
+        return KeysetPage(search_catalog(query, limit=per_page), per_page)
+
+    values, _ = decode_cursor(cursor)
+    after = None
+    if values is not None:
+        try:
+            after = (float(values[0]), int(values[1]))
+        except (IndexError, ValueError):
+            after = None
+    hits = ranked_hits(query, limit=per_page + 1, after=after)
+    next_cursor = None
+    if len(hits) > per_page:
+        hits = hits[:per_page]
+        next_cursor = encode_cursor([repr(hits[-1][2]), hits[-1][3]])
+    objects = _load_hits([(kind, obj_id) for kind, obj_id, _, _ in hits])
+    return KeysetPage(objects, per_page, next_cursor=next_cursor)
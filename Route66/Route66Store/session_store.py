@@ -0,0 +1,93 @@
+"""
+Session engine: reads from a cache, writes through to the database.
+
+Django's cached_db engine with two changes:
+
+- entries are cached for at most SESSION_CACHE_TIMEOUT seconds instead of
+  the whole session age. With an in-process cache every worker keeps its
+  own copy, so this bounds how long a worker can serve a session another
+  worker has since changed (and how much memory idle sessions hold). With a
+  shared cache (Redis, memcached) it can be as long as SESSION_COOKIE_AGE.
+- a cache that is down or refuses a key only costs the database read: every
+  cache error on the read and fill path is logged and the session is served
+  from (and saved to) the database as if the cache were cold. Deleting
+  still fails loudly when the cache can't be cleared, so a flushed
+  (logged-out) session can't live on in it.
+
+The database row stays the source of truth, so a cold or flushed cache
+never loses a session; ``clearsessions`` keeps working unchanged.
+
+    SESSION_ENGINE = 'Route66Store.session_store'
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'route66.session.'
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def _cache_timeout(self, expiry_age):
+        limit = getattr(settings, 'SESSION_CACHE_TIMEOUT', None)
+        return expiry_age if limit is None else min(expiry_age, limit)
+
+    def _cache_get(self):
+        try:
+            return self._cache.get(self.cache_key)
+        except Exception:
+            logger.warning('Session cache read failed; using the database', exc_info=True)
+            return None
+
+    def _cache_set(self, data, expiry_age):
+        try:
+            self._cache.set(self.cache_key, data, self._cache_timeout(expiry_age))
+        except Exception:
+            logger.warning('Session cache write failed', exc_info=True)
+
+    def load(self):
+        data = self._cache_get()
+        if data is None:
+            s = self._get_session_from_db()
+            if s is None:
+                return {}
+            data = self.decode(s.session_data)
+            self._cache_set(data, self.get_expiry_age(expiry=s.expire_date))
+        return data
+
+    def save(self, must_create=False):
+        super(cached_db.SessionStore, self).save(must_create)
+        self._cache_set(self._session, self.get_expiry_age())
+
+    async def aload(self):
+        try:
+            data = await self._cache.aget(await self.acache_key())
+        except Exception:
+            logger.warning('Session cache read failed; using the database', exc_info=True)
+            data = None
+        if data is None:
+            s = await self._aget_session_from_db()
+            if s is None:
+                return {}
+            data = self.decode(s.session_data)
+            try:
+                await self._cache.aset(
+                    await self.acache_key(), data,
+                    self._cache_timeout(await self.aget_expiry_age(expiry=s.expire_date)),
+                )
+            except Exception:
+                logger.warning('Session cache write failed', exc_info=True)
+        return data
+
+    async def asave(self, must_create=False):
+        await super(cached_db.SessionStore, self).asave(must_create)
+        try:
+            await self._cache.aset(
+                await self.acache_key(), self._session, self._cache_timeout(await self.aget_expiry_age()),
+            )
+        except Exception:
+            logger.warning('Session cache write failed', exc_info=True)
@@ -0,0 +1,123 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from . import autocomplete, images, page_cache, routers, search, sqlite, wishlists
+from .models import Brand, Cart, CartItem, Category, HotWheelsCase, Product, Review, Wishlist
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=HotWheelsCase)
+def index_catalog_item(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=HotWheelsCase)
+def unindex_catalog_item(sender, instance, **kwargs):
+    search.unindex_object(instance)
+
+
+# After commit, so a rolled-back save never shows up in the suggestions
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=HotWheelsCase)
+@receiver(post_save, sender=Brand)
+def update_suggestions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    saved = {Product: autocomplete.product_saved, HotWheelsCase: autocomplete.case_saved, Brand: autocomplete.brand_saved}
+    transaction.on_commit(partial(saved[sender], instance))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=HotWheelsCase)
+@receiver(post_delete, sender=Brand)
+def drop_suggestions(sender, instance, **kwargs):
+    deleted = {
+        Product: autocomplete.product_deleted, HotWheelsCase: autocomplete.case_deleted, Brand: autocomplete.brand_deleted,
+    }
+    transaction.on_commit(partial(deleted[sender], instance.pk))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_product_rating(sender, instance, raw=False, **kwargs):
+    if raw or not instance.product_id:
+        return
+    Product.refresh_rating_stats(instance.product_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=HotWheelsCase)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=HotWheelsCase)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Review)
+def bump_catalog_generation(sender, raw=False, **kwargs):
+    if raw:
+        return
+    page_cache.bump_generation()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=HotWheelsCase)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brand)
+def build_image_derivatives(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    images.schedule(instance)
+
+
+# When carts live in their own database the ORM's cascading delete only sees
+# the (empty) cart tables on default, so clear the real rows here.
+@receiver(post_delete, sender=User)
+def drop_user_carts(sender, instance, **kwargs):
+    if not routers.separate_cart_db():
+        return
+    Cart.objects.filter(user_id=instance.pk).delete()
+    Wishlist.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=HotWheelsCase)
+def drop_cart_lines(sender, instance, **kwargs):
+    if not routers.separate_cart_db():
+        return
+    if sender is Product:
+        CartItem.objects.filter(product_id=instance.pk).delete()
+        Wishlist.products.through.objects.filter(product_id=instance.pk).delete()
+    else:
+        CartItem.objects.filter(case_id=instance.pk).delete()
+
+
+@receiver(m2m_changed, sender=Wishlist.products.through)
+def invalidate_wishlist_ids(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        user_ids = [instance.user_id] if action in ('post_add', 'post_remove', 'post_clear') else []
+    elif action == 'pre_clear':
+        # Cleared from the product side (product.wishlist_set): find the owners first
+        wishlist_ids = sender.objects.filter(product_id=instance.pk).values_list('wishlist_id', flat=True)
+        user_ids = list(Wishlist.objects.filter(pk__in=list(wishlist_ids)).values_list('user_id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        user_ids = list(Wishlist.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+    else:
+        return
+    # after commit, so a concurrent read can't cache the old set again
+    for user_id in user_ids:
+        transaction.on_commit(partial(wishlists.invalidate, user_id), using=routers.cart_db())
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    sqlite.apply_pragmas(connection)
@@ -0,0 +1,72 @@
+"""
+SQLite tuning profiles.
+
+settings.SQLITE_PROFILE picks one:
+
+``performance``
+    WAL journal (readers and the writer stop blocking each other),
+    ``synchronous=NORMAL`` (fsync at checkpoints; still crash-safe in WAL
+    mode), a memory-mapped file and a 64 MiB page cache, a 5s busy_timeout,
+    persistent connections and ``BEGIN IMMEDIATE`` transactions (the last two
+    are set on DATABASES in settings.py).
+``default``
+    SQLite's stock behaviour: rollback journal, a fresh connection per
+    request, deferred transactions.
+
+The pragmas are applied to every new SQLite connection by the
+connection_created receiver in signals.py.
+
+Immediate transactions matter for the write views: a deferred transaction
+that reads before it writes has to upgrade its lock, and SQLite refuses
+that upgrade at once (no busy wait) while another writer holds the lock,
+which is where "database is locked" comes from under load. BEGIN IMMEDIATE
+takes the write lock up front, so competing writers queue on busy_timeout.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+
+from . import routers
+
+PROFILES = {
+    'default': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative = KiB
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def pragmas(profile=None):
+    return PROFILES[profile or getattr(settings, 'SQLITE_PROFILE', 'default')]
+
+
+def apply_pragmas(connection, profile=None):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas(profile).items():
+            if name == 'journal_mode' and connection.alias == routers.REPLICA:
+                continue  # changing it writes to the file; replication owns the replica
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def write_transaction(using=None):
+    """
+    Run a write view in one transaction on database ``using`` (an alias, or a
+    callable returning one, e.g. routers.cart_db). Under the performance
+    profile that transaction starts with BEGIN IMMEDIATE.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            alias = using() if callable(using) else using
+            with transaction.atomic(using=alias):
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+from django import template
+from django.utils.html import format_html
+
+from Route66Store import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_img(image, alt='', sizes='(max-width: 600px) 50vw, 320px', css_class='', lazy=True, element_id=''):
+    """
+    Render an <img> (wrapped in <picture> with a WebP source) whose srcset
+    points at the resized derivatives no wider than the upload. Falls back to
+    the original upload until the derivatives have been generated, and for
+    uploads narrower than every derivative width.
+    """
+    if not image:
+        return ''
+    loading = 'lazy' if lazy else 'eager'
+    available = images.ready_widths(image.name)
+    if not available:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" id="{}" loading="{}">', image.url, alt, css_class, element_id, loading,
+        )
+
+    def srcset(ext):
+        return ', '.join(f"{images.derivative_url(image.name, w, ext)} {w}w" for w in available)
+
+    largest = available[-1]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" id="{}" loading="{}"></picture>',
+        srcset('webp'), sizes,
+        images.derivative_url(image.name, largest, 'jpg'), srcset('jpg'), sizes,
+        alt, css_class, element_id, loading,
+    )
@@ -1,22 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
 app_name = 'store'
 
+# Read-only catalog pages have async twins for ASGI deployments
+catalog = async_views if settings.ASYNC_CATALOG_VIEWS else views
+
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('products/', views.product_list, name='product_list'),
-    path('products/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('', catalog.home, name='home'),
+    path('products/', catalog.product_list, name='product_list'),
+    path('products/<slug:slug>/', catalog.product_detail, name='product_detail'),
     path('category/<slug:slug>/', views.category_detail, name='category_detail'),
-    path('cases/', views.cases_list, name='cases_list'),
+    path('cases/', catalog.cases_list, name='cases_list'),
     path('cases/<slug:slug>/', views.case_detail, name='case_detail'),
-    path('search/', views.search, name='search'),
+    path('search/', catalog.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     # Cart
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/product/<int:product_id>/', views.add_to_cart, name='add_to_cart_product'),
     path('cart/add/case/<int:case_id>/', views.add_to_cart, name='add_to_cart_case'),
-    path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
-    path('cart/update/<int:item_id>/', views.update_cart, name='update_cart'),
+    path('cart/remove/<str:line_id>/', views.remove_from_cart, name='remove_from_cart'),
+    path('cart/update/<str:line_id>/', views.update_cart, name='update_cart'),
     # Checkout & Orders
     path('checkout/', views.checkout, name='checkout'),
     path('orders/', views.order_list, name='order_list'),
@@ -24,6 +29,17 @@ urlpatterns = [
     # Wishlist
     path('wishlist/', views.wishlist_view, name='wishlist'),
     path('wishlist/toggle/<int:product_id>/', views.toggle_wishlist, name='toggle_wishlist'),
+    # Read-only JSON API
+    path('api/products/', api.product_list, name='api_product_list'),
+    path('api/products/<slug:slug>/', api.product_detail, name='api_product_detail'),
+    path('api/cases/', api.case_list, name='api_case_list'),
+    path('api/cases/<slug:slug>/', api.case_detail, name='api_case_detail'),
+    path('api/categories/', api.category_list, name='api_category_list'),
+    path('api/brands/', api.brand_list, name='api_brand_list'),
+    # Staff
+    path('staff/orders/export/', views.export_orders, name='export_orders'),
+    # Monitoring
+    path('metrics/', views.metrics_view, name='metrics'),
     # Auth — custom views with toast notifications
     path('signup/', views.signup_view, name='signup'),
     path('accounts/login/', views.login_view, name='login'),
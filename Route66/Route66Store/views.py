@@ -1,89 +1,152 @@
+import time
+from decimal import Decimal, InvalidOperation
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib import messages
-from django.db.models import Q, Avg
-from django.http import JsonResponse
-from .models import Product, Category, Brand, HotWheelsCase, Cart, CartItem, Order, OrderItem, Review, Wishlist
-from .forms import SignUpForm, ReviewForm, CheckoutForm
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+from .models import Product, Category, Brand, HotWheelsCase, Cart, Order, Review
+from .forms import SignUpForm, ReviewForm, CheckoutForm, OrderExportForm
+from . import autocomplete, cart_store, cart_summary, exports, metrics, page_cache, recommendations, reservations, routers, wishlists
+from .conditional import conditional_detail
+from .page_cache import anonymous_page_cache
+from .sqlite import write_transaction
+from .orders import EmptyCartError, cart_lines, lines_total, place_order
+from . import search as catalog_search
+from .pagination import paginate_request, wants_json
+
+
+def _product_json(p):
+    return {
+        'id': p.id, 'name': p.name, 'slug': p.slug, 'url': p.get_absolute_url(),
+        'brand': p.brand.name if p.brand else None, 'scale': p.scale,
+        'price': str(p.price), 'display_price': str(p.display_price),
+        'stock': p.stock, 'image': p.image.url if p.image else None,
+    }
 
 
-def home(request):
-    featured_products = Product.objects.filter(is_featured=True, stock__gt=0)[:8]
-    new_arrivals = Product.objects.filter(is_new_arrival=True, stock__gt=0)[:8]
-    treasure_hunts = Product.objects.filter(is_treasure_hunt=True, stock__gt=0)[:4]
-    featured_cases = HotWheelsCase.objects.filter(is_featured=True, stock__gt=0)[:3]
-    categories = Category.objects.all()
-    context = {
-        'featured_products': featured_products,
-        'new_arrivals': new_arrivals,
-        'treasure_hunts': treasure_hunts,
-        'featured_cases': featured_cases,
-        'categories': categories,
+def _case_json(c):
+    return {
+        'id': c.id, 'name': c.name, 'slug': c.slug, 'url': c.get_absolute_url(),
+        'year': c.year, 'series_letter': c.series_letter,
+        'price': str(c.price), 'stock': c.stock, 'image': c.image.url if c.image else None,
     }
-    return render(request, 'store/home.html', context)
 
 
-def product_list(request):
-    products = Product.objects.filter(stock__gt=0)
-    query = request.GET.get('q', '')
-    category_slug = request.GET.get('category', '')
-    brand_id = request.GET.get('brand', '')
-    scale = request.GET.get('scale', '')
-    sort = request.GET.get('sort', '-created_at')
-    min_price = request.GET.get('min_price', '')
-    max_price = request.GET.get('max_price', '')
-    is_treasure_hunt = request.GET.get('is_treasure_hunt', '')
+def home_querysets():
+    """The independent querysets behind the home page (shared with async_views)."""
+    in_stock = Product.objects.filter(stock__gt=0).select_related('brand')
+    return {
+        'featured_products': in_stock.filter(is_featured=True)[:8],
+        'new_arrivals': in_stock.filter(is_new_arrival=True)[:8],
+        'treasure_hunts': in_stock.filter(is_treasure_hunt=True)[:4],
+        'featured_cases': HotWheelsCase.objects.filter(is_featured=True, stock__gt=0)[:3],
+        'categories': Category.objects.all(),
+    }
+
+
+@anonymous_page_cache
+def home(request):
+    return render(request, 'store/home.html', {**home_querysets(), **wishlists.grid_context(request.user)})
+
+
+PRODUCT_SORTS = {
+    'price_asc': 'price', 'price_desc': '-price',
+    'name': 'name', '-created_at': '-created_at', 'popular': '-id',
+}
+
+
+def _number_param(params, name, parse):
+    """params[name] parsed with parse (int or Decimal), None when absent; ValueError when not a number."""
+    raw = params.get(name, '')
+    if not raw:
+        return None
+    try:
+        value = parse(raw)
+    except (ValueError, InvalidOperation):
+        value = None
+    if value is None or (isinstance(value, Decimal) and not value.is_finite()):
+        raise ValueError(f'{name} must be a number, not {raw!r}.')
+    return value
+
+
+def filter_product_list(params):
+    """
+    Apply product_list's query parameters. Returns (queryset, ordering,
+    selected) where selected holds the raw filter values for the template.
+    Raises ValueError when brand, min_price or max_price is not a number.
+    """
+    products = Product.objects.filter(stock__gt=0).select_related('brand')
+    query = params.get('q', '')
+    category_slug = params.get('category', '')
+    brand_id = _number_param(params, 'brand', int)
+    scale = params.get('scale', '')
+    sort = params.get('sort', '-created_at')
+    min_price = _number_param(params, 'min_price', Decimal)
+    max_price = _number_param(params, 'max_price', Decimal)
+    is_treasure_hunt = params.get('is_treasure_hunt', '')
 
     if query:
-        products = products.filter(
-            Q(name__icontains=query) | Q(car_model__icontains=query) |
-            Q(description__icontains=query) | Q(series__icontains=query)
-        )
+        products = catalog_search.filter_products(products, query)
     if category_slug:
         products = products.filter(category__slug=category_slug)
-    if brand_id:
+    if brand_id is not None:
         products = products.filter(brand_id=brand_id)
     if scale:
         products = products.filter(scale=scale)
     if is_treasure_hunt:
         products = products.filter(is_treasure_hunt=True)
-    if min_price:
+    if min_price is not None:
         products = products.filter(price__gte=min_price)
-    if max_price:
+    if max_price is not None:
         products = products.filter(price__lte=max_price)
 
-    sort_map = {
-        'price_asc': 'price', 'price_desc': '-price',
-        'name': 'name', '-created_at': '-created_at', 'popular': '-id',
-    }
-    products = products.order_by(sort_map.get(sort, '-created_at'))
-
-    categories = Category.objects.all()
-    brands = Brand.objects.all()
-    context = {
-        'products': products,
-        'categories': categories,
-        'brands': brands,
+    selected = {
         'query': query,
         'selected_category': category_slug,
         'selected_scale': scale,
         'sort': sort,
         'is_treasure_hunt': is_treasure_hunt,
     }
+    return products, PRODUCT_SORTS.get(sort, '-created_at'), selected
+
+
+@anonymous_page_cache
+def product_list(request):
+    try:
+        products, ordering, selected = filter_product_list(request.GET)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error), content_type='text/plain; charset=utf-8')
+    page = paginate_request(request, products, ordering)
+    if wants_json(request):
+        return JsonResponse(page.as_json([_product_json(p) for p in page]))
+
+    context = {
+        'products': page,
+        'page': page,
+        'categories': Category.objects.all(),
+        'brands': Brand.objects.all(),
+        **selected,
+        **wishlists.grid_context(request.user),
+    }
     return render(request, 'store/product_list.html', context)
 
 
+@conditional_detail(Product)
+@anonymous_page_cache
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug)
-    reviews = product.reviews.all().order_by('-created_at')
-    avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
-    related = Product.objects.filter(category=product.category).exclude(id=product.id)[:4]
-    in_wishlist = False
-    if request.user.is_authenticated:
-        wishlist, _ = Wishlist.objects.get_or_create(user=request.user)
-        in_wishlist = wishlist.products.filter(id=product.id).exists()
+    product = get_object_or_404(Product.objects.select_related('brand'), slug=slug)
+    reviews = paginate_request(request, product.reviews.select_related('user'), '-created_at', per_page=10)
+    related = recommendations.related_products(product)
+    wishlist_context = wishlists.grid_context(request.user)
 
     review_form = ReviewForm()
     if request.method == 'POST' and request.user.is_authenticated:
@@ -92,145 +155,192 @@ def product_detail(request, slug):
             r = review_form.save(commit=False)
             r.product = product
             r.user = request.user
-            r.save()
+            with transaction.atomic():
+                r.save()  # plus the rating/search-index updates its signals make
             messages.success(request, 'Review submitted!')
             return redirect('store:product_detail', slug=slug)
 
     context = {
         'product': product,
         'reviews': reviews,
-        'avg_rating': avg_rating,
+        'avg_rating': product.rating_avg if product.review_count else None,
         'related': related,
-        'in_wishlist': in_wishlist,
+        'in_wishlist': product.id in (wishlist_context['wishlist_ids'] or ()),
         'review_form': review_form,
+        **wishlist_context,
     }
     return render(request, 'store/product_detail.html', context)
 
 
+@anonymous_page_cache
 def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug)
-    products = Product.objects.filter(category=category, stock__gt=0)
-    return render(request, 'store/category_detail.html', {'category': category, 'products': products})
+    products = Product.objects.filter(category=category, stock__gt=0).select_related('brand')
+    page = paginate_request(request, products, '-created_at')
+    if wants_json(request):
+        return JsonResponse(page.as_json([_product_json(p) for p in page]))
+    return render(request, 'store/category_detail.html', {
+        'category': category, 'products': page, 'page': page, **wishlists.grid_context(request.user),
+    })
 
 
+@anonymous_page_cache
 def cases_list(request):
     cases = HotWheelsCase.objects.filter(stock__gt=0)
-    return render(request, 'store/cases_list.html', {'cases': cases})
+    page = paginate_request(request, cases, '-created_at')
+    if wants_json(request):
+        return JsonResponse(page.as_json([_case_json(c) for c in page]))
+    return render(request, 'store/cases_list.html', {'cases': page, 'page': page})
 
 
+@conditional_detail(HotWheelsCase)
+@anonymous_page_cache
 def case_detail(request, slug):
     case = get_object_or_404(HotWheelsCase, slug=slug)
     return render(request, 'store/case_detail.html', {'case': case})
 
 
-@login_required
 def cart_view(request):
-    cart, _ = Cart.objects.get_or_create(user=request.user)
-    items = cart.cartitem_set.select_related('product', 'case').all()
-    return render(request, 'store/cart.html', {'cart': cart, 'items': items})
+    items = cart_store.for_request(request).lines()
+    return render(request, 'store/cart.html', {'items': items, 'cart_total': lines_total(items)})
+
+
+def _end_checkout(request):
+    """
+    Editing the cart abandons checkout: give back the stock held for it first,
+    so the caps below count the shopper's own units and removed lines stop
+    holding any. Opening checkout again places a fresh hold.
+    """
+    if request.user.is_authenticated:
+        reservations.release_user_holds(request.user)
 
 
-@login_required
 def add_to_cart(request, product_id=None, case_id=None):
-    cart, _ = Cart.objects.get_or_create(user=request.user)
+    back = request.META.get('HTTP_REFERER', 'store:cart')
+    _end_checkout(request)
     if product_id:
-        product = get_object_or_404(Product, id=product_id)
-        item, created = CartItem.objects.get_or_create(cart=cart, product=product, case=None)
+        stock_item = get_object_or_404(Product, id=product_id)
     elif case_id:
-        case = get_object_or_404(HotWheelsCase, id=case_id)
-        item, created = CartItem.objects.get_or_create(cart=cart, case=case, product=None)
+        stock_item = get_object_or_404(HotWheelsCase, id=case_id)
     else:
         messages.error(request, 'Invalid item.')
         return redirect('store:home')
 
-    if not created:
-        item.quantity += 1
-        item.save()
+    reservations.release_expired_on(stock_item)
+    if stock_item.stock < 1:
+        messages.error(request, 'Sorry, that item is out of stock.')
+        return redirect(back)
+    cart = cart_store.for_request(request)
+    try:
+        added = cart.add(stock_item)
+    except cart_store.CartFullError:
+        messages.error(request, 'Your cart is full. Log in to add more items.')
+        return redirect(back)
+    if not added:
+        messages.warning(request, f'Only {stock_item.stock} in stock.')
+        return redirect(back)
     messages.success(request, 'Added to cart!')
-    return redirect(request.META.get('HTTP_REFERER', 'store:cart'))
+    return cart.save(redirect(back))
 
 
-@login_required
-def remove_from_cart(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    item.delete()
+def remove_from_cart(request, line_id):
+    _end_checkout(request)
+    cart = cart_store.for_request(request)
+    cart.remove(cart.line(line_id))
     messages.success(request, 'Removed from cart.')
-    return redirect('store:cart')
+    return cart.save(redirect('store:cart'))
 
 
-@login_required
-def update_cart(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
+def update_cart(request, line_id):
+    _end_checkout(request)
+    cart = cart_store.for_request(request)
+    line = cart.line(line_id)
     qty = int(request.POST.get('quantity', 1))
-    if qty < 1:
-        item.delete()
-    else:
-        item.quantity = qty
-        item.save()
-    return redirect('store:cart')
+    stock_item = line.product or line.case
+    if qty > stock_item.stock:
+        reservations.release_expired_on(stock_item)
+    stock = stock_item.stock
+    if qty > stock:
+        qty = stock
+        messages.warning(request, f'Only {stock} in stock.')
+    cart.set_quantity(line, qty)
+    return cart.save(redirect('store:cart'))
 
 
 @login_required
 def checkout(request):
     cart, _ = Cart.objects.get_or_create(user=request.user)
-    items = cart.cartitem_set.all()
+    items = cart_lines(cart)
     if not items:
         messages.warning(request, 'Your cart is empty.')
         return redirect('store:cart')
 
+    hold_expires = None
+    if request.method != 'POST':
+        try:
+            hold_expires = reservations.hold_cart(request.user, items)
+        except reservations.OutOfStockError as exc:
+            messages.error(request, f'Sorry, not enough stock left for: {exc.names}.')
+            return redirect('store:cart')
+
     if request.method == 'POST':
         form = CheckoutForm(request.POST)
         if form.is_valid():
-            order = Order.objects.create(
-                user=request.user,
-                shipping_address=form.cleaned_data['shipping_address'],
-                notes=form.cleaned_data.get('notes', ''),
-            )
-            for ci in items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=ci.product,
-                    case=ci.case,
-                    quantity=ci.quantity,
-                    price=ci.unit_price,
+            try:
+                order = place_order(
+                    request.user, cart,
+                    shipping_address=form.cleaned_data['shipping_address'],
+                    notes=form.cleaned_data.get('notes', ''),
                 )
-            order.calculate_total()
-            items.delete()
+            except EmptyCartError:
+                messages.warning(request, 'Your cart is empty.')
+                return redirect('store:cart')
+            except reservations.OutOfStockError as exc:
+                messages.error(request, f'Sorry, not enough stock left for: {exc.names}.')
+                return redirect('store:cart')
+            cart_summary.invalidate(request.user)
             messages.success(request, f'Order #{order.id} placed successfully! 🏁')
             return redirect('store:order_detail', order_id=order.id)
     else:
         form = CheckoutForm()
-    return render(request, 'store/checkout.html', {'cart': cart, 'items': items, 'form': form})
+    return render(request, 'store/checkout.html', {
+        'cart': cart, 'items': items, 'cart_total': lines_total(items), 'form': form,
+        'hold_expires': hold_expires,
+    })
 
 
 @login_required
 def order_list(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'store/order_list.html', {'orders': orders})
+    orders = Order.objects.filter(user=request.user).annotate(item_count=Count('items'))
+    page = paginate_request(request, orders, '-created_at', per_page=20)
+    return render(request, 'store/order_list.html', {'orders': page, 'page': page})
 
 
 @login_required
 def order_detail(request, order_id):
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    # the lines render from their snapshots, without touching the catalog
+    order = get_object_or_404(Order.objects.prefetch_related('items'), id=order_id, user=request.user)
     return render(request, 'store/order_detail.html', {'order': order})
 
 
 @login_required
 def wishlist_view(request):
-    wishlist, _ = Wishlist.objects.get_or_create(user=request.user)
-    return render(request, 'store/wishlist.html', {'wishlist': wishlist})
+    ids = wishlists.product_ids(request.user)
+    products = Product.objects.filter(id__in=ids).select_related('brand')
+    page = paginate_request(request, products, '-created_at')
+    if wants_json(request):
+        return JsonResponse(page.as_json([_product_json(p) for p in page]))
+    return render(request, 'store/wishlist.html', {'products': page, 'page': page, 'wishlist_ids': ids})
 
 
 @login_required
+@write_transaction(routers.cart_db)
 def toggle_wishlist(request, product_id):
     product = get_object_or_404(Product, id=product_id)
-    wishlist, _ = Wishlist.objects.get_or_create(user=request.user)
-    if wishlist.products.filter(id=product_id).exists():
-        wishlist.products.remove(product)
-        messages.info(request, 'Removed from wishlist.')
-    else:
-        wishlist.products.add(product)
+    if wishlists.toggle(request.user, product):
         messages.success(request, 'Added to wishlist!')
+    else:
+        messages.info(request, 'Removed from wishlist.')
     return redirect(request.META.get('HTTP_REFERER', 'store:wishlist'))
 
 
@@ -241,7 +351,7 @@ def signup_view(request):
             user = form.save()
             login(request, user)
             messages.success(request, f'Welcome to Route66, {user.username}!')
-            return redirect('store:home')
+            return cart_store.merge_guest_cart(request, redirect('store:home'))
     else:
         form = SignUpForm()
     return render(request, 'store/signup.html', {'form': form})
@@ -258,7 +368,7 @@ def login_view(request):
             login(request, user)
             messages.success(request, f'Welcome back, {user.username}! You are now logged in.')
             next_url = request.GET.get('next', '') or request.POST.get('next', '')
-            return redirect(next_url if next_url else 'store:home')
+            return cart_store.merge_guest_cart(request, redirect(next_url if next_url else 'store:home'))
         else:
             messages.error(request, 'Invalid username or password. Please try again.')
     else:
@@ -276,11 +386,66 @@ def logout_view(request):
 
 
 def search(request):
-    query = request.GET.get('q', '')
-    products = Product.objects.filter(
-        Q(name__icontains=query) | Q(car_model__icontains=query) | Q(description__icontains=query)
-    ) if query else Product.objects.none()
-    cases = HotWheelsCase.objects.filter(name__icontains=query) if query else HotWheelsCase.objects.none()
+    query = request.GET.get('q', '').strip()
+    page = catalog_search.search_page(query, request.GET.get('cursor')).build_urls(request)
+    products = [r for r in page if isinstance(r, Product)]
+    cases = [r for r in page if isinstance(r, HotWheelsCase)]
+    if wants_json(request):
+        return JsonResponse(page.as_json(
+            [dict(_product_json(p), kind='product') if isinstance(p, Product) else dict(_case_json(p), kind='case')
+             for p in page]
+        ))
     return render(request, 'store/search_results.html', {
-        'query': query, 'products': products, 'cases': cases
+        'query': query, 'results': page, 'page': page, 'products': products, 'cases': cases
+    })
+
+
+@require_safe
+def search_suggest(request):
+    """Typeahead for the header search box: /search/suggest/?q=ferr -> {"query": ..., "suggestions": [...]}."""
+    query = request.GET.get('q', '')[:100]
+    try:
+        limit = min(max(int(request.GET.get('limit', 0)), 0), 20)
+    except ValueError:
+        limit = 0
+    started = time.perf_counter()
+    suggestions = autocomplete.suggest(query, limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    response = JsonResponse({'query': query, 'suggestions': [s.as_json() for s in suggestions]})
+    response['Server-Timing'] = f'suggest;dur={elapsed_ms:.3f}'
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+@staff_member_required
+def export_orders(request):
+    """
+    Order lines as a streamed CSV or JSONL download, e.g.
+    /staff/orders/export/?format=jsonl&since=2026-09-01&until=2026-09-30&status=delivered
+    The X-Last-Order-Id header is the after_id for the next incremental pull.
+    """
+    form = OrderExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain; charset=utf-8')
+    fmt = form.cleaned_data['format'] or 'csv'
+    export = exports.OrderExport(
+        since=form.cleaned_data['since'], until=form.cleaned_data['until'],
+        statuses=form.cleaned_data['status'], after_id=form.cleaned_data['after_id'],
+    )
+    response = StreamingHttpResponse(export.stream(fmt), content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(fmt)}"'
+    response['X-Last-Order-Id'] = export.last_order_id or export.after_id
+    return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for the in-process request metrics."""
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in allowed_ips):
+        return HttpResponseForbidden()
+    cache_stats = page_cache.stats()
+    body = metrics.render({
+        'route66_page_cache_hits_total': ('Anonymous page cache hits.', cache_stats['hits']),
+        'route66_page_cache_misses_total': ('Anonymous page cache misses.', cache_stats['misses']),
     })
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
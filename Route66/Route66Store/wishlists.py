@@ -0,0 +1,94 @@
+"""
+Per-user wishlist membership: the set of product ids a shopper has saved.
+
+The set is loaded with one query over the wishlist link table and cached
+under a per-user version number, like cart_summary. Any change to a
+Wishlist's products (m2m_changed, see signals.py) bumps the version, so the
+next read reloads; stale entries simply expire.
+
+Product grids take the whole set into their context as ``wishlist_ids``,
+and the product card marks its heart with ``product.id in wishlist_ids``, a
+set lookup per card instead of a query.
+
+A shopper's Wishlist row is only created when they first save a product;
+reading an empty wishlist never writes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import routers
+from .models import Wishlist
+
+
+def _timeout():
+    return getattr(settings, 'WISHLIST_CACHE_TIMEOUT', 60 * 60)
+
+
+def _version_key(user_id):
+    return f'wishlist:version:{user_id}'
+
+
+def _ids_key(user_id, version):
+    return f'wishlist:ids:{user_id}:{version}'
+
+
+def _version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(user_id), version, None)
+    return version
+
+
+def product_ids(user):
+    """frozenset of the product ids on user's wishlist (empty for anonymous users)."""
+    if not user.is_authenticated:
+        return frozenset()
+    key = _ids_key(user.pk, _version(user.pk))
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Wishlist.products.through.objects.filter(wishlist__user_id=user.pk).values_list('product_id', flat=True)
+        )
+        cache.set(key, ids, _timeout())
+    return ids
+
+
+def contains(user, product_id):
+    return product_id in product_ids(user)
+
+
+def grid_context(user):
+    """Template context for product grids: the ids behind each card's heart."""
+    return {'wishlist_ids': product_ids(user) if user.is_authenticated else None}
+
+
+def add(user, product):
+    with transaction.atomic(using=routers.cart_db()):
+        wishlist, _ = Wishlist.objects.get_or_create(user=user)
+        wishlist.products.add(product)
+
+
+def remove(user, product):
+    wishlist = Wishlist.objects.filter(user=user).first()
+    if wishlist is not None:
+        wishlist.products.remove(product)
+
+
+def toggle(user, product):
+    """Save or unsave product; returns True when it is now on the wishlist."""
+    if contains(user, product.id):
+        remove(user, product)
+        return False
+    add(user, product)
+    return True
+
+
+def invalidate(user_id):
+    """Call after any change to user_id's wishlist products."""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
@@ -59,3 +59,90 @@ document.querySelectorAll('.cart-remove').forEach(btn => {
         }
     });
 });
+
+// ── Header search suggestions ─────────────────────────────────────────────────
+const searchInput = document.querySelector('.search-input[data-suggest-url]');
+const suggestionBox = document.getElementById('searchSuggestions');
+if (searchInput && suggestionBox) {
+    const KIND_LABELS = { product: 'Model', case: 'Case', brand: 'Brand', car_model: 'Car', series: 'Series' };
+    let debounce = null;
+    let controller = null;
+    let active = -1;
+
+    const links = () => suggestionBox.querySelectorAll('a');
+
+    function closeSuggestions() {
+        suggestionBox.hidden = true;
+        searchInput.setAttribute('aria-expanded', 'false');
+        active = -1;
+    }
+
+    function highlight(index) {
+        const items = links();
+        items.forEach((item, i) => item.classList.toggle('active', i === index));
+        active = index;
+    }
+
+    function render(suggestions) {
+        suggestionBox.replaceChildren(...suggestions.map(suggestion => {
+            const link = document.createElement('a');
+            link.href = suggestion.url;
+            link.setAttribute('role', 'option');
+            const text = document.createElement('span');
+            text.textContent = suggestion.text;
+            const kind = document.createElement('span');
+            kind.className = 'suggestion-kind';
+            kind.textContent = KIND_LABELS[suggestion.kind] || '';
+            link.append(text, kind);
+            return link;
+        }));
+        active = -1;
+        suggestionBox.hidden = suggestions.length === 0;
+        searchInput.setAttribute('aria-expanded', String(suggestions.length > 0));
+    }
+
+    function fetchSuggestions() {
+        const query = searchInput.value.trim();
+        if (controller) controller.abort();
+        if (!query) {
+            closeSuggestions();
+            return;
+        }
+        controller = new AbortController();
+        const url = `${searchInput.dataset.suggestUrl}?q=${encodeURIComponent(query)}`;
+        fetch(url, { signal: controller.signal, headers: { Accept: 'application/json' } })
+            .then(response => response.ok ? response.json() : { suggestions: [] })
+            .then(data => {
+                if (data.query === undefined || data.query.trim() === searchInput.value.trim()) {
+                    render(data.suggestions);
+                }
+            })
+            .catch(error => { if (error.name !== 'AbortError') closeSuggestions(); });
+    }
+
+    searchInput.addEventListener('input', () => {
+        clearTimeout(debounce);
+        debounce = setTimeout(fetchSuggestions, 120);
+    });
+
+    searchInput.addEventListener('keydown', (e) => {
+        const items = links();
+        if (suggestionBox.hidden || !items.length) return;
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            // -1 is the text box itself
+            let next = active + (e.key === 'ArrowDown' ? 1 : -1);
+            if (next >= items.length) next = -1;
+            if (next < -1) next = items.length - 1;
+            highlight(next);
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            window.location.href = items[active].href;
+        } else if (e.key === 'Escape') {
+            closeSuggestions();
+        }
+    });
+
+    searchInput.addEventListener('blur', () => setTimeout(closeSuggestions, 150));
+    searchInput.addEventListener('focus', () => { if (links().length) suggestionBox.hidden = false; });
+}